@@ -1,7 +1,13 @@
-from flask import Flask
-from flask_cors import CORS
 import os
-from .config import config
+from .utils.startup import log_lazy_imports, preload_heavy_modules, report_import_times, track_boot_imports
+
+# Time the framework imports so the boot report covers what workers actually load
+with track_boot_imports():
+    from flask import Flask
+    from flask_cors import CORS
+    from .config import config
+    from .utils.json_provider import FastJSONProvider
+    from .utils.http_responses import init_http_responses
 
 def create_app(config_name=None):
     """Application factory pattern"""
@@ -11,14 +17,32 @@ def create_app(config_name=None):
     config_name = config_name or os.getenv('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
+    # Fast JSON encoding, compression and conditional responses
+    app.json = FastJSONProvider(app)
+    init_http_responses(app)
+    
     # Configure CORS
     CORS(app, origins=app.config['CORS_ORIGINS'])
     
     # Register blueprints
-    from .routes.flow import flow_bp
-    from .routes.auth import auth_bp
+    with track_boot_imports():
+        from .routes.flow import flow_bp
+        from .routes.auth import auth_bp
+        from .routes.saved_flows import saved_flows_bp
     
     app.register_blueprint(flow_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/api')
+    app.register_blueprint(saved_flows_bp, url_prefix='/api')
+    
+    # Heavy SDKs (openai, supabase, jwt) are imported lazily by the services.
+    # In preload mode import them now so the gunicorn master shares them with workers.
+    if app.config['STARTUP_MODE'] == 'preload':
+        preload_heavy_modules()
+        # Map the pose catalog in the master too (compiling it if stale)
+        from .services.pose_catalog import get_pose_catalog
+        get_pose_catalog()
+    if app.config['REPORT_IMPORT_TIMES']:
+        report_import_times()
+        log_lazy_imports()
     
     return app
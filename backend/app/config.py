@@ -26,6 +26,25 @@ class Config:
     
     # Rate limiting
     RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', 60))
+    
+    # Response compression (bytes below COMPRESS_MIN_SIZE are sent uncompressed)
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+    
+    # Multi-session program generation; at most PROGRAM_MAX_CONCURRENCY sessions
+    # call the LLM at once per request, the rest queue behind them
+    PROGRAM_MAX_SESSIONS = int(os.getenv('PROGRAM_MAX_SESSIONS', 7))
+    PROGRAM_MAX_CONCURRENCY = int(os.getenv('PROGRAM_MAX_CONCURRENCY', 3))
+    
+    # Daily OpenAI token allowance per signed-in user (0 disables the quota)
+    LLM_DAILY_TOKEN_QUOTA = int(os.getenv('LLM_DAILY_TOKEN_QUOTA', 0))
+    
+    # Startup mode: 'lazy' defers heavy SDK imports until first use,
+    # 'preload' imports them in create_app (shared copy-on-write under gunicorn --preload)
+    STARTUP_MODE = os.getenv('STARTUP_MODE', 'lazy').lower()
+    # Print boot import times per top-level package and log heavy SDK imports when they first happen
+    REPORT_IMPORT_TIMES = os.getenv('REPORT_IMPORT_TIMES', 'True').lower() == 'true'
 
 class DevelopmentConfig(Config):
     """Development configuration"""
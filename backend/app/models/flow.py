@@ -0,0 +1,92 @@
+import sys
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional
+
+SEGMENTS = ('warmup', 'main', 'cooldown')
+
+
+# Durations are stored in signed 64-bit arrays; clamp so sums of many poses cannot overflow
+MAX_DURATION_SECONDS = 2 ** 31 - 1
+
+
+def coerce_duration(value: Any) -> int:
+    """Coerce an LLM-provided duration (45, '45', 45.0, '') to whole seconds"""
+    try:
+        seconds = int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return max(-MAX_DURATION_SECONDS, min(seconds, MAX_DURATION_SECONDS))
+
+
+@dataclass(slots=True)
+class PoseStep:
+    """A single pose in a flow"""
+    pose: str
+    duration: int
+    description: str = ''
+
+    def to_dict(self) -> dict:
+        """Convert to the JSON shape used in API responses"""
+        return {
+            'pose': self.pose,
+            'duration': self.duration,
+            'description': self.description
+        }
+
+    @classmethod
+    def from_dict(cls, data: Any) -> Optional['PoseStep']:
+        """Normalize a raw LLM item; returns None for anything that is not a dict"""
+        if not isinstance(data, dict):
+            return None
+        return cls(
+            pose=sys.intern(str(data.get('pose') or data.get('name') or '')),
+            duration=coerce_duration(data.get('duration', 0)),
+            description=data.get('description') or data.get('cue') or data.get('cues') or ''
+        )
+
+
+class Flow:
+    """A flow split into warmup, main and cooldown segments.
+
+    Segments are kept as separate lists so they can be read without copying,
+    and the total duration is maintained on every append.
+    """
+
+    __slots__ = ('description', 'warmup', 'main', 'cooldown', 'total_seconds')
+
+    def __init__(self, description: str = ''):
+        self.description = description
+        self.warmup: List[PoseStep] = []
+        self.main: List[PoseStep] = []
+        self.cooldown: List[PoseStep] = []
+        self.total_seconds = 0
+
+    def append(self, step: PoseStep, segment: str = 'main') -> None:
+        """Add a step to the end of a segment"""
+        getattr(self, segment).append(step)
+        self.total_seconds += step.duration
+
+    def extend(self, items: Any, segment: str = 'main') -> None:
+        """Normalize raw items and add the valid ones to a segment"""
+        for item in items or []:
+            step = PoseStep.from_dict(item)
+            if step is not None:
+                self.append(step, segment)
+
+    def segment(self, name: str) -> List[PoseStep]:
+        """Return a segment's steps (the live list, not a copy)"""
+        return getattr(self, name)
+
+    def __iter__(self) -> Iterator[PoseStep]:
+        return chain(self.warmup, self.main, self.cooldown)
+
+    def __len__(self) -> int:
+        return len(self.warmup) + len(self.main) + len(self.cooldown)
+
+    def pose_names(self) -> List[str]:
+        return [step.pose for step in self]
+
+    def to_sequence(self) -> List[Dict]:
+        """Convert to the flat flow_sequence JSON shape; each step records its segment"""
+        return [dict(step.to_dict(), segment=segment) for segment in SEGMENTS for step in self.segment(segment)]
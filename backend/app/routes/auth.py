@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from ..services.supabase_service import SupabaseService
 from ..services.jwt_service import JWTService
 from ..models.user import User
+from ..utils.auth import token_required
 import hashlib
 import secrets
 from datetime import datetime
@@ -164,8 +165,9 @@ def login():
                 'errors': ['Your account has been deactivated']
             }), 403
         
-        # Create JWT token
+        # Create JWT tokens
         access_token = jwt_service.create_access_token(user_data)
+        refresh_token = jwt_service.create_refresh_token(user_data)
         
         # Prepare user response (remove sensitive data)
         user_response = {
@@ -181,6 +183,7 @@ def login():
             'message': 'Login successful',
             'user': user_response,
             'access_token': access_token,
+            'refresh_token': refresh_token,
             'token_type': 'Bearer'
         }), 200
         
@@ -191,6 +194,161 @@ def login():
             'errors': [str(e)]
         }), 500
 
+@auth_bp.route('/auth/refresh', methods=['POST'])
+def refresh():
+    """Exchange a refresh token for a new access/refresh token pair"""
+    try:
+        data = request.get_json() or {}
+        
+        if not data.get('refresh_token'):
+            return jsonify({
+                'success': False,
+                'message': 'Validation failed',
+                'errors': ['refresh_token is required']
+            }), 400
+        
+        jwt_service = JWTService()
+        payload = jwt_service.verify_token(data['refresh_token'], token_type='refresh')
+        if not payload:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid refresh token',
+                'errors': ['Refresh token is invalid, expired or revoked']
+            }), 401
+        
+        # Refreshing is rare, so this is where deactivated accounts are caught
+        supabase_service = SupabaseService()
+        user_data = supabase_service.get_user_by_id(payload.get('user_id'))
+        if not user_data or not user_data.get('is_active', True):
+            if user_data:
+                # Kill any access tokens still in flight for the deactivated account
+                jwt_service.revoke_user_tokens(user_data['id'])
+            return jsonify({
+                'success': False,
+                'message': 'Account deactivated',
+                'errors': ['Your account is no longer active']
+            }), 403
+        
+        # Rotate: only the request that revokes the presented refresh token gets new tokens
+        consumed = jwt_service.consume_refresh_token(payload)
+        if consumed is None:
+            return jsonify({
+                'success': False,
+                'message': 'Token refresh failed',
+                'errors': ['Could not revoke the old refresh token; please try again']
+            }), 503
+        if not consumed:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid refresh token',
+                'errors': ['Refresh token is invalid, expired or revoked']
+            }), 401
+        
+        return jsonify({
+            'success': True,
+            'message': 'Token refreshed',
+            'access_token': jwt_service.create_access_token(user_data),
+            'refresh_token': jwt_service.create_refresh_token(user_data),
+            'token_type': 'Bearer'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
+@auth_bp.route('/auth/logout', methods=['POST'])
+@token_required
+def logout():
+    """Revoke the current access token and, if provided, the refresh token"""
+    try:
+        data = request.get_json(silent=True) or {}
+        jwt_service = JWTService()
+        
+        revoked = jwt_service.revoke_token(g.token_payload)
+        
+        if data.get('refresh_token'):
+            refresh_payload = jwt_service.verify_token(data['refresh_token'], token_type='refresh')
+            if refresh_payload and refresh_payload.get('user_id') == g.token_payload.get('user_id'):
+                revoked = jwt_service.revoke_token(refresh_payload) and revoked
+        
+        if not revoked:
+            return jsonify({
+                'success': False,
+                'message': 'Logout failed',
+                'errors': ['Could not revoke the session tokens; please try again']
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logged out successfully'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
+@auth_bp.route('/auth/logout-all', methods=['POST'])
+@token_required
+def logout_all():
+    """Revoke every token issued to the current user on any device"""
+    try:
+        if not JWTService().revoke_user_tokens(g.current_user['id']):
+            return jsonify({
+                'success': False,
+                'message': 'Logout failed',
+                'errors': ['Could not revoke the session tokens; please try again']
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'message': 'Logged out on all devices'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
+@auth_bp.route('/auth/deactivate', methods=['POST'])
+@token_required
+def deactivate():
+    """Deactivate the current user's account and revoke all of its tokens"""
+    try:
+        result = SupabaseService().update_user(g.current_user['id'], {'is_active': False})
+        if not result['success']:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to deactivate account',
+                'errors': [result.get('error', result.get('message', 'Unknown error'))]
+            }), 500
+        
+        if not JWTService().revoke_user_tokens(g.current_user['id']):
+            return jsonify({
+                'success': False,
+                'message': 'Account deactivated, but sessions could not be revoked',
+                'errors': ['Existing tokens stay valid until they expire or are refreshed']
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'message': 'Account deactivated'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
 @auth_bp.route('/auth/test', methods=['GET'])
 def auth_test():
     """Test endpoint for auth routes"""
@@ -215,7 +373,11 @@ def auth_test():
             'environment_variables': env_status,
             'available_endpoints': {
                 'signup': 'POST /api/auth/signup',
-                'login': 'POST /api/auth/login'
+                'login': 'POST /api/auth/login',
+                'refresh': 'POST /api/auth/refresh',
+                'logout': 'POST /api/auth/logout',
+                'logout_all': 'POST /api/auth/logout-all',
+                'deactivate': 'POST /api/auth/deactivate'
             }
         })
     except Exception as e:
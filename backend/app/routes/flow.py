@@ -1,8 +1,29 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 from ..services.llm_service import LLMService
+from ..services.program_service import ProgramService
+from ..services.usage_service import get_usage_accountant
+from ..utils.auth import token_optional, token_required
 
 flow_bp = Blueprint('flow', __name__)
 
+def current_user_id():
+    return g.current_user['id'] if g.current_user else None
+
+def quota_exceeded_response():
+    """429 response when the signed-in user has used up today's token quota, else None"""
+    quota = current_app.config['LLM_DAILY_TOKEN_QUOTA']
+    user_id = current_user_id()
+    if not quota or not user_id:
+        return None
+    # Served from this worker's in-memory counters; no database round-trip
+    if get_usage_accountant().tokens_today(user_id) < quota:
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Daily generation limit reached',
+        'errors': [f'Daily quota of {quota} tokens used; try again tomorrow']
+    }), 429
+
 @flow_bp.route('/flow/test', methods=['GET'])
 def test_flow_endpoint():
     """Test endpoint for flow routes"""
@@ -13,6 +34,7 @@ def test_flow_endpoint():
     })
 
 @flow_bp.route('/flow/generate', methods=['POST'])
+@token_optional
 def generate_flow():
     """Generate a yoga flow using LLM"""
     try:
@@ -28,8 +50,12 @@ def generate_flow():
                 'errors': ['routineName, timeLength, and description are required']
             }), 400
         
+        exceeded = quota_exceeded_response()
+        if exceeded:
+            return exceeded
+        
         # Initialize LLM service
-        llm_service = LLMService()
+        llm_service = LLMService(user_id=current_user_id())
         
         # Generate the flow
         result = llm_service.generate_yoga_flow(data)
@@ -40,6 +66,7 @@ def generate_flow():
                 'message': 'Flow generated successfully!',
                 'flow_description': result['flow_description'],
                 'flow_sequence': result['flow_sequence'],
+                'validation': result.get('validation'),
                 'routine_name': data.get('routineName'),
                 'duration': data.get('timeLength')
             })
@@ -56,3 +83,73 @@ def generate_flow():
             'message': 'Error processing request',
             'error': str(e)
         }), 500
+
+@flow_bp.route('/flow/program', methods=['POST'])
+@token_optional
+def generate_program():
+    """Generate a multi-session program, streaming each session as NDJSON when it completes"""
+    data = request.get_json() or {}
+    
+    # Validate required fields
+    if not data.get('routineName') or not data.get('timeLength') or not data.get('description') or not data.get('sessions'):
+        return jsonify({
+            'success': False,
+            'message': 'Missing required fields',
+            'errors': ['routineName, timeLength, description, and sessions are required']
+        }), 400
+    
+    max_sessions = current_app.config['PROGRAM_MAX_SESSIONS']
+    try:
+        sessions = int(data.get('sessions'))
+    except (TypeError, ValueError):
+        sessions = 0
+    if sessions < 1 or sessions > max_sessions:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid program',
+            'errors': [f'sessions must be between 1 and {max_sessions}']
+        }), 400
+    
+    focuses = data.get('focuses')
+    if focuses is not None and (not isinstance(focuses, list) or not focuses
+                                or not all(isinstance(focus, str) and focus.strip() for focus in focuses)):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid program',
+            'errors': ['focuses must be a non-empty list of strings']
+        }), 400
+    
+    exceeded = quota_exceeded_response()
+    if exceeded:
+        return exceeded
+    
+    try:
+        program_service = ProgramService(
+            max_concurrency=current_app.config['PROGRAM_MAX_CONCURRENCY'],
+            llm_service=LLMService(user_id=current_user_id())
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Error processing request',
+            'error': str(e)
+        }), 500
+    
+    def stream():
+        for event in program_service.generate_program({**data, 'sessions': sessions}):
+            yield current_app.json.dumps(event) + '\n'
+    
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
+@flow_bp.route('/flow/usage', methods=['GET'])
+@token_required
+def get_usage():
+    """Today's LLM usage and remaining quota for the current user"""
+    usage = get_usage_accountant().usage_today(g.current_user['id'])
+    quota = current_app.config['LLM_DAILY_TOKEN_QUOTA']
+    return jsonify({
+        'success': True,
+        'usage': usage,
+        'quota': quota or None,
+        'remaining': max(0, quota - usage['total_tokens']) if quota else None
+    })
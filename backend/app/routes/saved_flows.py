@@ -0,0 +1,148 @@
+from flask import Blueprint, current_app, g, jsonify, request
+from datetime import datetime
+from ..services.supabase_service import SupabaseService
+from ..services.flow_search import get_flow_search_index
+from ..utils.auth import token_required
+
+saved_flows_bp = Blueprint('saved_flows', __name__)
+
+# Saved flows live in a Supabase flows table:
+#   id uuid primary key default gen_random_uuid(), user_id text, routine_name text,
+#   description text, duration_minutes int, flow_sequence jsonb, created_at timestamptz
+
+def _flows_for_index(user_id):
+    return SupabaseService().get_flows_for_index(user_id)
+
+def search_index():
+    return get_flow_search_index(current_app.config['DATABASE_URL'], _flows_for_index)
+
+def index_best_effort(method, *args):
+    """Update the search index without failing a write that already reached Supabase"""
+    try:
+        getattr(search_index(), method)(*args)
+    except Exception as e:
+        # The index is rebuilt from the flows table on its next resync
+        print(f"⚠️  WARNING: Search index update failed: {e}")
+
+@saved_flows_bp.route('/flows', methods=['POST'])
+@token_required
+def save_flow():
+    """Save a generated flow for the current user"""
+    try:
+        data = request.get_json() or {}
+
+        if not data.get('routineName') or not isinstance(data.get('flow_sequence'), list) or not data['flow_sequence']:
+            return jsonify({
+                'success': False,
+                'message': 'Missing required fields',
+                'errors': ['routineName and a non-empty flow_sequence are required']
+            }), 400
+
+        try:
+            duration_minutes = int(data.get('timeLength') or 0)
+        except (TypeError, ValueError):
+            duration_minutes = 0
+
+        flow_data = {
+            'user_id': g.current_user['id'],
+            'routine_name': data['routineName'].strip(),
+            'description': data.get('flow_description', ''),
+            'duration_minutes': duration_minutes,
+            'flow_sequence': data['flow_sequence'],
+            'created_at': datetime.utcnow().isoformat()
+        }
+
+        result = SupabaseService().create_flow(flow_data)
+        if not result['success']:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to save flow',
+                'errors': [result.get('error', 'Unknown error')]
+            }), 500
+
+        index_best_effort('add_flow', g.current_user['id'], result['flow'])
+
+        return jsonify({
+            'success': True,
+            'message': 'Flow saved successfully',
+            'flow': result['flow']
+        }), 201
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
+@saved_flows_bp.route('/flows', methods=['GET'])
+@token_required
+def list_flows():
+    """List the current user's saved flows"""
+    flows = SupabaseService().get_flows_by_user(g.current_user['id'])
+    return jsonify({
+        'success': True,
+        'flows': flows
+    })
+
+@saved_flows_bp.route('/flows/search', methods=['GET'])
+@token_required
+def search_flows():
+    """Search the current user's saved flows by pose, cue, name or description"""
+    try:
+        min_minutes = request.args.get('min_minutes', type=int)
+        max_minutes = request.args.get('max_minutes', type=int)
+        limit = min(request.args.get('limit', 20, type=int), 100)
+
+        results = search_index().search(
+            g.current_user['id'],
+            request.args.get('q', ''),
+            min_seconds=min_minutes * 60 if min_minutes is not None else None,
+            max_seconds=max_minutes * 60 if max_minutes is not None else None,
+            limit=limit
+        )
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'errors': [str(e)]
+        }), 500
+
+@saved_flows_bp.route('/flows/<flow_id>', methods=['GET'])
+@token_required
+def get_flow(flow_id):
+    """Get one of the current user's saved flows"""
+    flow = SupabaseService().get_flow(g.current_user['id'], flow_id)
+    if not flow:
+        return jsonify({
+            'success': False,
+            'message': 'Flow not found',
+            'errors': ['No saved flow with that id']
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'flow': flow
+    })
+
+@saved_flows_bp.route('/flows/<flow_id>', methods=['DELETE'])
+@token_required
+def delete_flow(flow_id):
+    """Delete one of the current user's saved flows"""
+    if not SupabaseService().delete_flow(g.current_user['id'], flow_id):
+        return jsonify({
+            'success': False,
+            'message': 'Flow not found',
+            'errors': ['No saved flow with that id']
+        }), 404
+
+    index_best_effort('remove_flow', g.current_user['id'], flow_id)
+
+    return jsonify({
+        'success': True,
+        'message': 'Flow deleted successfully'
+    })
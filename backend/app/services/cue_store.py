@@ -0,0 +1,149 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from ..models.flow import PoseStep
+from .flow_validator import canonical_pose_name
+from .pose_catalog import NAME_FIELDS, get_pose_catalog
+
+# Catalog fields that may hold alignment cues, in order of preference
+CUE_FIELDS = ('cues', 'alignment_cues', 'instructions', 'description')
+# Optional numeric catalog field; higher values are listed first in lean prompts
+RANK_FIELD = 'popularity'
+MAX_CUE_LENGTH = 300
+MIN_CUE_LENGTH = 10
+MAX_CUE_SENTENCES = 3
+
+# Learned cues are shown to other users, so only plain alignment prose is kept:
+# letters, digits and light punctuation, no markup, links or quoting
+CUE_CHARACTERS = re.compile(r"^[A-Za-z0-9 ,.;:'()/\-\u2013\u2014]+$")
+BLOCKED_CUE_WORDS = re.compile(
+    r"\b(https?|www|ignore|instructions?|prompt|system|assistant|password|token|click|visit)\b",
+    re.IGNORECASE
+)
+
+
+def _cue_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(str(item).strip() for item in value if item)
+    return value.strip() if isinstance(value, str) else ''
+
+
+def looks_like_cue(text: str) -> bool:
+    """True for short, plain alignment cues that are safe to reuse in other users' flows"""
+    if not MIN_CUE_LENGTH <= len(text) <= MAX_CUE_LENGTH:
+        return False
+    if not CUE_CHARACTERS.match(text) or BLOCKED_CUE_WORDS.search(text):
+        return False
+    return len([part for part in re.split(r'[.;]', text) if part.strip()]) <= MAX_CUE_SENTENCES
+
+
+class CueStore:
+    """Alignment cues per canonical pose name.
+
+    Cues come from two places: the pose catalog (poses_database.json) and the
+    descriptions the model wrote in earlier flows. Model-written cues come
+    from user-driven prompts and are served to other users, so only ones that
+    pass ``looks_like_cue`` are learned. A few variants are kept per pose and
+    handed out in rotation so repeated flows don't read identically. Learned
+    cues live in this worker's memory only.
+    """
+
+    def __init__(self, catalog=None, max_poses: int = 2000, variants: int = 3):
+        self.catalog = catalog
+        self.max_poses = max_poses
+        self.variants = variants
+        self._lock = threading.Lock()
+        # canonical name -> {'name', 'cues', 'next'}
+        self._learned: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._catalog_names: Optional[List[str]] = None
+
+    def _catalog_cue(self, key: str) -> str:
+        if self.catalog is None:
+            return ''
+        pose = self.catalog.get(key, CUE_FIELDS)
+        for field in CUE_FIELDS:
+            cue = _cue_text((pose or {}).get(field))
+            if cue:
+                return cue
+        return ''
+
+    def learn(self, steps: Iterable[PoseStep]) -> None:
+        """Remember cues the model wrote for these steps"""
+        with self._lock:
+            for step in steps:
+                cue = _cue_text(step.description)
+                if not step.pose or not looks_like_cue(cue):
+                    continue
+                key = canonical_pose_name(step.pose)
+                entry = self._learned.get(key)
+                if entry is None:
+                    entry = self._learned[key] = {'name': step.pose, 'cues': [], 'next': 0}
+                    if len(self._learned) > self.max_poses:
+                        self._learned.popitem(last=False)
+                else:
+                    self._learned.move_to_end(key)
+                if cue not in entry['cues'] and len(entry['cues']) < self.variants:
+                    entry['cues'].append(cue)
+
+    def cue_for(self, pose: str) -> str:
+        """A stored cue for ``pose``, or '' if there is none"""
+        key = canonical_pose_name(pose)
+        with self._lock:
+            entry = self._learned.get(key)
+            if entry is not None:
+                cue = entry['cues'][entry['next'] % len(entry['cues'])]
+                entry['next'] += 1
+                return cue
+        return self._catalog_cue(key)
+
+    def fill(self, steps: Iterable[PoseStep]) -> int:
+        """Fill in missing descriptions from stored cues; returns how many were filled"""
+        filled = 0
+        for step in steps:
+            if step.pose and not _cue_text(step.description):
+                cue = self.cue_for(step.pose)
+                if cue:
+                    step.description = cue
+                    filled += 1
+        return filled
+
+    def _load_catalog_names(self) -> List[str]:
+        ranked = []
+        if self.catalog is not None:
+            for key in self.catalog.canonical_names():
+                pose = self.catalog.get(key, NAME_FIELDS + CUE_FIELDS + (RANK_FIELD,)) or {}
+                if any(_cue_text(pose.get(field)) for field in CUE_FIELDS):
+                    try:
+                        rank = float(pose.get(RANK_FIELD) or 0)
+                    except (TypeError, ValueError):
+                        rank = 0.0
+                    ranked.append((-rank, key, next((str(pose[f]) for f in NAME_FIELDS if pose.get(f)), key)))
+        return [name for _, _, name in sorted(ranked)]
+
+    def pose_names(self, limit: int = 100) -> List[str]:
+        """Display names of catalog poses with cues, most popular first.
+
+        Only catalog poses are listed: every worker loads the same catalog, so
+        the list (and the prompt built from it) is the same on every worker
+        and every call. Learned cues stay in this worker's memory and are
+        only used to fill descriptions the model left out.
+        """
+        with self._lock:
+            if self._catalog_names is None:
+                self._catalog_names = self._load_catalog_names()
+            return self._catalog_names[:limit]
+
+
+_cue_store: Optional[CueStore] = None
+_cue_store_lock = threading.Lock()
+
+
+def get_cue_store() -> CueStore:
+    """Return the process-wide CueStore, seeded from the pose catalog"""
+    global _cue_store
+    if _cue_store is None:
+        with _cue_store_lock:
+            if _cue_store is None:
+                _cue_store = CueStore(get_pose_catalog())
+    return _cue_store
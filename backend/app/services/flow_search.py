@@ -0,0 +1,366 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from ..models.flow import coerce_duration
+from ..utils.startup import register_after_fork
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Term-frequency weight per field (BM25F-style): names matter more than cue text
+FIELD_WEIGHTS = {
+    'routine_name': 3,
+    'pose': 2,
+    'description': 1,
+    'cue': 1,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_CACHED_USERS = 1000
+DEFAULT_INDEX_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', 'flow_search.sqlite3'))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def index_path_for(database_url: str) -> str:
+    """Keep the index next to the SQL store when that store is SQLite"""
+    if database_url.startswith('sqlite:///'):
+        path = database_url[len('sqlite:///'):]
+        if path == ':memory:':
+            return path
+        root, _ = os.path.splitext(path)
+        return f'{root}_search.sqlite3'
+    return DEFAULT_INDEX_PATH
+
+
+def flow_terms(flow: Dict) -> Dict[str, int]:
+    """Weighted term frequencies for a saved flow"""
+    terms: Dict[str, int] = {}
+
+    def add(text: str, weight: int) -> None:
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + weight
+
+    add(flow.get('routine_name', ''), FIELD_WEIGHTS['routine_name'])
+    add(flow.get('description', ''), FIELD_WEIGHTS['description'])
+    for step in flow.get('flow_sequence') or []:
+        if isinstance(step, dict):
+            add(step.get('pose', ''), FIELD_WEIGHTS['pose'])
+            add(step.get('description', ''), FIELD_WEIGHTS['cue'])
+    return terms
+
+
+class UserIndex:
+    """In-memory inverted index over one user's saved flows"""
+
+    __slots__ = ('version', 'postings', 'docs', 'doc_terms', 'total_length', '_sorted_terms')
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # flow_id -> (length, duration_seconds, routine_name)
+        self.docs: Dict[str, Tuple[int, int, str]] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        self._sorted_terms: Optional[List[str]] = None
+
+    def add(self, flow_id: str, terms: Dict[str, int], duration_seconds: int, routine_name: str) -> None:
+        self.remove(flow_id)
+        length = sum(terms.values())
+        self.docs[flow_id] = (length, duration_seconds, routine_name)
+        self.total_length += length
+        self.doc_terms[flow_id] = list(terms)
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[flow_id] = tf
+        self._sorted_terms = None
+
+    def remove(self, flow_id: str) -> None:
+        doc = self.docs.pop(flow_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc[0]
+        for term in self.doc_terms.pop(flow_id, []):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(flow_id, None)
+                if not docs:
+                    del self.postings[term]
+        self._sorted_terms = None
+
+    def expand_prefix(self, prefix: str, limit: int = 50) -> List[str]:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        start = bisect_left(terms, prefix)
+        matches = []
+        for term in terms[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def search(self, query: str, min_seconds: Optional[int] = None, max_seconds: Optional[int] = None,
+               limit: int = 20) -> List[Dict]:
+        """Rank flows with BM25; the last query word also matches as a prefix"""
+        words = tokenize(query)
+        if not self.docs:
+            return []
+
+        # Each query word contributes its best-matching term; the last word may be unfinished
+        groups: List[List[str]] = [[word] for word in words[:-1]]
+        if words:
+            groups.append(self.expand_prefix(words[-1]))
+
+        doc_count = len(self.docs)
+        avg_length = self.total_length / doc_count if doc_count else 0
+        scores: Dict[str, float] = {}
+        for group in groups:
+            best: Dict[str, float] = {}
+            for term in group:
+                docs = self.postings.get(term, {})
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for flow_id, tf in docs.items():
+                    length = self.docs[flow_id][0]
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                    best[flow_id] = max(best.get(flow_id, 0.0), idf * norm)
+            for flow_id, score in best.items():
+                scores[flow_id] = scores.get(flow_id, 0.0) + score
+
+        if not words:
+            # Empty query: list everything in the duration range
+            scores = {flow_id: 0.0 for flow_id in self.docs}
+
+        results = []
+        for flow_id, score in scores.items():
+            _, duration, routine_name = self.docs[flow_id]
+            if min_seconds is not None and duration < min_seconds:
+                continue
+            if max_seconds is not None and duration > max_seconds:
+                continue
+            results.append({
+                'id': flow_id,
+                'routine_name': routine_name,
+                'duration_seconds': duration,
+                'score': round(score, 4),
+            })
+        results.sort(key=lambda r: r['score'], reverse=True)
+        return results[:limit]
+
+
+class FlowSearchIndex:
+    """Per-user search over saved flows, persisted in SQLite.
+
+    Postings are written on every save/delete, so a restarted worker loads a
+    user's index straight from its postings instead of re-reading flows. Each
+    user has a version number; a worker reloads its cached copy when another
+    worker has changed that user's index.
+
+    The index is a cache of the flows table, not the source of truth. When
+    ``source`` is given, a user with no index at all (e.g. after a redeploy
+    wiped the disk, or on a new replica) is built from it before the first
+    search returns. After that searches always answer from the persisted
+    index; once it is older than ``resync_seconds`` a background thread
+    rebuilds it to pick up flows saved through other replicas. A rebuild is
+    discarded if the user's version changed while the source was being read,
+    so it never drops a save or delete that landed in the meantime.
+    """
+
+    def __init__(self, path: str, source: Optional[Callable[[str], Optional[List[Dict]]]] = None,
+                 resync_seconds: float = 300.0):
+        self.path = path
+        self.source = source
+        self.resync_seconds = resync_seconds
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS search_users (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS search_docs ('
+            ' user_id TEXT NOT NULL, flow_id TEXT NOT NULL, length INTEGER NOT NULL,'
+            ' duration_seconds INTEGER NOT NULL, routine_name TEXT, PRIMARY KEY (user_id, flow_id));'
+            'CREATE TABLE IF NOT EXISTS search_postings ('
+            ' user_id TEXT NOT NULL, term TEXT NOT NULL, flow_id TEXT NOT NULL, tf INTEGER NOT NULL,'
+            ' PRIMARY KEY (user_id, flow_id, term));'
+            'CREATE TABLE IF NOT EXISTS search_sync (user_id TEXT PRIMARY KEY, synced_at REAL NOT NULL);'
+        )
+        self._conn.commit()
+        self._cache: 'OrderedDict[str, UserIndex]' = OrderedDict()
+        self._syncing: set = set()
+
+    def _version(self, user_id: str) -> int:
+        row = self._conn.execute('SELECT version FROM search_users WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self, user_id: str) -> int:
+        self._conn.execute(
+            'INSERT INTO search_users VALUES (?, 1) '
+            'ON CONFLICT(user_id) DO UPDATE SET version = version + 1', (user_id,)
+        )
+        return self._version(user_id)
+
+    def _load(self, user_id: str) -> UserIndex:
+        version = self._version(user_id)
+        index = self._cache.get(user_id)
+        if index is not None and index.version == version:
+            self._cache.move_to_end(user_id)
+            return index
+
+        index = UserIndex(version)
+        for flow_id, length, duration, routine_name in self._conn.execute(
+                'SELECT flow_id, length, duration_seconds, routine_name FROM search_docs WHERE user_id = ?',
+                (user_id,)):
+            index.docs[flow_id] = (length, duration, routine_name)
+            index.total_length += length
+        for term, flow_id, tf in self._conn.execute(
+                'SELECT term, flow_id, tf FROM search_postings WHERE user_id = ?', (user_id,)):
+            index.postings.setdefault(term, {})[flow_id] = tf
+            index.doc_terms.setdefault(flow_id, []).append(term)
+
+        self._cache[user_id] = index
+        if len(self._cache) > MAX_CACHED_USERS:
+            self._cache.popitem(last=False)
+        return index
+
+    @staticmethod
+    def _document(flow: Dict) -> Tuple[str, Dict[str, int], int, str]:
+        duration = sum(coerce_duration(step.get('duration', 0)) for step in flow.get('flow_sequence') or []
+                       if isinstance(step, dict))
+        return str(flow['id']), flow_terms(flow), duration, flow.get('routine_name', '')
+
+    def _write_document(self, user_id: str, flow_id: str, terms: Dict[str, int], duration: int,
+                        routine_name: str) -> None:
+        self._conn.execute('DELETE FROM search_postings WHERE user_id = ? AND flow_id = ?', (user_id, flow_id))
+        self._conn.execute(
+            'INSERT OR REPLACE INTO search_docs VALUES (?, ?, ?, ?, ?)',
+            (user_id, flow_id, sum(terms.values()), duration, routine_name)
+        )
+        self._conn.executemany(
+            'INSERT INTO search_postings VALUES (?, ?, ?, ?)',
+            [(user_id, term, flow_id, tf) for term, tf in terms.items()]
+        )
+
+    def add_flow(self, user_id: str, flow: Dict) -> None:
+        """Index (or re-index) a saved flow"""
+        flow_id, terms, duration, routine_name = self._document(flow)
+        with self._lock:
+            index = self._load(user_id)
+            self._write_document(user_id, flow_id, terms, duration, routine_name)
+            index.version = self._bump_version(user_id)
+            self._conn.commit()
+            index.add(flow_id, terms, duration, routine_name)
+
+    def _sync_state(self, user_id: str) -> str:
+        """'missing' if the user has no index here, 'stale' if it is due a resync, else 'fresh'"""
+        row = self._conn.execute('SELECT synced_at FROM search_sync WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            known = self._conn.execute('SELECT 1 FROM search_users WHERE user_id = ?', (user_id,)).fetchone()
+            return 'stale' if known else 'missing'
+        if self.resync_seconds > 0 and time.time() - row[0] > self.resync_seconds:
+            return 'stale'
+        return 'fresh'
+
+    def sync_user(self, user_id: str) -> bool:
+        """Rebuild a user's index from the source of truth.
+
+        Returns False if the source could not be read or the index changed
+        while it was being read; the next search will try again.
+        """
+        if self.source is None:
+            return False
+        with self._lock:
+            version = self._version(user_id)
+        flows = self.source(user_id)
+        if flows is None:
+            return False
+        documents = [self._document(flow) for flow in flows if flow.get('id') is not None]
+        with self._lock:
+            if self._version(user_id) != version:
+                return False
+            self._conn.execute('DELETE FROM search_postings WHERE user_id = ?', (user_id,))
+            self._conn.execute('DELETE FROM search_docs WHERE user_id = ?', (user_id,))
+            for flow_id, terms, duration, routine_name in documents:
+                self._write_document(user_id, flow_id, terms, duration, routine_name)
+            self._conn.execute('INSERT OR REPLACE INTO search_sync VALUES (?, ?)', (user_id, time.time()))
+            self._bump_version(user_id)
+            self._conn.commit()
+        return True
+
+    def remove_flow(self, user_id: str, flow_id: str) -> None:
+        """Drop a deleted flow from the index"""
+        flow_id = str(flow_id)
+        with self._lock:
+            index = self._load(user_id)
+            self._conn.execute('DELETE FROM search_postings WHERE user_id = ? AND flow_id = ?', (user_id, flow_id))
+            self._conn.execute('DELETE FROM search_docs WHERE user_id = ? AND flow_id = ?', (user_id, flow_id))
+            index.version = self._bump_version(user_id)
+            self._conn.commit()
+            index.remove(flow_id)
+
+    def _sync_in_background(self, user_id: str) -> None:
+        with self._lock:
+            if user_id in self._syncing:
+                return
+            self._syncing.add(user_id)
+
+        def run():
+            try:
+                if not self.sync_user(user_id):
+                    print(f"⚠️  WARNING: Could not resync search index for user {user_id}")
+            except Exception as e:
+                print(f"⚠️  WARNING: Search index resync failed for user {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._syncing.discard(user_id)
+
+        threading.Thread(target=run, name='search-resync', daemon=True).start()
+
+    def search(self, user_id: str, query: str, min_seconds: Optional[int] = None,
+               max_seconds: Optional[int] = None, limit: int = 20) -> List[Dict]:
+        if self.source is not None:
+            with self._lock:
+                state = self._sync_state(user_id)
+            if state == 'missing':
+                # Nothing to serve yet; a failed read returns an empty result and retries next time
+                if not self.sync_user(user_id):
+                    print(f"⚠️  WARNING: Could not build search index for user {user_id}")
+            elif state == 'stale':
+                self._sync_in_background(user_id)
+        with self._lock:
+            index = self._load(user_id)
+            return index.search(query, min_seconds, max_seconds, limit)
+
+
+_indexes: Dict[str, FlowSearchIndex] = {}
+
+
+def _reset_after_fork() -> None:
+    # SQLite connections must not be shared across fork
+    _indexes.clear()
+
+
+register_after_fork(_reset_after_fork)
+
+
+def get_flow_search_index(database_url: str,
+                          source: Optional[Callable[[str], Optional[List[Dict]]]] = None) -> FlowSearchIndex:
+    """Return this worker's search index for the configured SQL store.
+
+    ``source(user_id)`` returns the user's saved flows (None on error) and is
+    used to rebuild indexes that are missing or stale.
+    """
+    path = index_path_for(database_url)
+    index = _indexes.get(path)
+    if index is None:
+        index = _indexes[path] = FlowSearchIndex(
+            path, source, resync_seconds=float(os.getenv('SEARCH_RESYNC_SECONDS', 300)))
+    return index
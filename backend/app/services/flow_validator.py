@@ -1 +1,380 @@
 # Flow validation service
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Container, Dict, Iterable, List, Optional, Set, Tuple, Union
+from ..models.flow import MAX_DURATION_SECONDS, SEGMENTS, Flow, coerce_duration
+from ..utils.startup import lazy_import
+
+UNSEGMENTED = -1
+SEGMENT_CODES = {segment: code for code, segment in enumerate(SEGMENTS)}
+
+# Below this many poses (about 40 typical flows) the pure-Python checks beat
+# numpy's per-call overhead, so single-flow validation never imports numpy
+VECTORIZE_MIN_POSES = 500
+
+_numpy = None
+
+
+def _load_numpy():
+    """Import numpy on first large batch; None when it is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            _numpy = lazy_import('numpy')
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def canonical_pose_name(name: Any) -> str:
+    """Normalize a pose name for comparisons (case and whitespace insensitive)"""
+    return ' '.join(str(name or '').lower().split())
+
+
+# Pose names repeat heavily across flows, so canonicalize each raw name once
+_canonical_str = lru_cache(maxsize=8192)(canonical_pose_name)
+
+
+@dataclass
+class ValidationRules:
+    """Tunable limits applied by FlowValidator"""
+    min_pose_seconds: int = 10
+    max_pose_seconds: int = 600
+    tolerance_seconds: int = 300
+    max_pose_repeats: int = 1
+    require_structure: bool = True
+    known_poses: Optional[Container[str]] = None  # canonical names (or a PoseCatalog); None skips the check
+
+
+class FlowBatch:
+    """Column-oriented view of many flows: one array per pose attribute.
+
+    Every pose of every flow is appended to the same set of typed arrays, so
+    checks run over contiguous buffers instead of walking per-pose dicts.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self.pose_ids = array('q')
+        self.durations = array('q')
+        self.segments = array('b')
+        self.empty_cues = array('b')
+        self.flow_index = array('q')
+        self.flow_starts = array('q', [0])
+        self.targets = array('q')
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def _intern(self, name: str) -> int:
+        key = _canonical_str(name) if isinstance(name, str) else canonical_pose_name(name)
+        pose_id = self._name_ids.get(key)
+        if pose_id is None:
+            pose_id = len(self.names)
+            self._name_ids[key] = pose_id
+            self.names.append(key)
+        return pose_id
+
+    def add_flow(self, flow: Union[Flow, Dict], target_seconds: Optional[int] = None) -> None:
+        """Append one Flow, or a dict given as split segments or a flat flow_sequence"""
+        self.add_flows([flow], [target_seconds])
+
+    def add_flows(self, flows: Iterable[Union[Flow, Dict]], targets: Iterable[Optional[int]]) -> None:
+        """Append many flows in one pass.
+
+        Each column is collected in a plain list and copied into its array
+        once at the end. Building a batch is dominated by per-pose Python
+        work, so the loop avoids per-pose function calls on the common path
+        (int durations, str poses and cues) and only falls back to the
+        coercion helpers for anything else.
+        """
+        pose_ids: List[int] = []
+        durations: List[int] = []
+        segments: List[int] = []
+        empty_cues: List[int] = []
+        flow_index: List[int] = []
+        flow_starts: List[int] = []
+        batch_targets: List[int] = []
+        name_ids = self._name_ids
+        intern = self._intern
+        segment_codes = SEGMENT_CODES
+        offset = len(self.durations)
+        flow_idx = len(self.targets)
+
+        for flow, target in zip(flows, targets):
+            if isinstance(flow, Flow):
+                parts = [(code, [step.to_dict() for step in flow.segment(segment)])
+                         for code, segment in enumerate(SEGMENTS)]
+            elif any(flow.get(segment) for segment in SEGMENTS):
+                parts = [(code, flow.get(segment) or []) for code, segment in enumerate(SEGMENTS)]
+            else:
+                # A flat flow_sequence carries each step's segment, if at all, in a "segment" key
+                parts = [(None, flow.get('flow_sequence') or flow.get('sequence') or [])]
+
+            for code, steps in parts:
+                for step in steps:
+                    if not isinstance(step, dict):
+                        continue
+                    pose = step.get('pose') or ''
+                    pose_id = name_ids.get(_canonical_str(pose)) if type(pose) is str else None
+                    pose_ids.append(intern(pose) if pose_id is None else pose_id)
+
+                    duration = step.get('duration', 0)
+                    if type(duration) is not int or not -MAX_DURATION_SECONDS <= duration <= MAX_DURATION_SECONDS:
+                        duration = coerce_duration(duration)
+                    durations.append(duration)
+
+                    if code is None:
+                        segment = step.get('segment')
+                        segments.append(segment_codes.get(segment, UNSEGMENTED) if type(segment) is str
+                                        else UNSEGMENTED)
+                    else:
+                        segments.append(code)
+
+                    description = step.get('description')
+                    if type(description) is str:
+                        empty_cues.append(0 if description.strip() else 1)
+                    else:
+                        empty_cues.append(0 if str(description or '').strip() else 1)
+                    flow_index.append(flow_idx)
+
+            flow_starts.append(offset + len(durations))
+            batch_targets.append(-1 if target is None else int(target))
+            flow_idx += 1
+
+        self.pose_ids.extend(pose_ids)
+        self.durations.extend(durations)
+        self.segments.extend(segments)
+        self.empty_cues.extend(empty_cues)
+        self.flow_index.extend(flow_index)
+        self.flow_starts.extend(flow_starts)
+        self.targets.extend(batch_targets)
+
+
+class FlowValidator:
+    """Validate generated or saved flows, one at a time or in large batches"""
+
+    def __init__(self, rules: Optional[ValidationRules] = None):
+        self.rules = rules or ValidationRules()
+
+    def validate(self, flow: Union[Flow, Dict], target_seconds: Optional[int] = None) -> Dict:
+        """Validate a single flow and return its report"""
+        return self.validate_batch([flow], [target_seconds])[0]
+
+    def validate_batch(self, flows: Iterable[Union[Flow, Dict]],
+                       targets: Optional[Iterable[Optional[int]]] = None) -> List[Dict]:
+        """Validate many flows in one pass and return one report per flow"""
+        flows = list(flows)
+        targets = list(targets) if targets is not None else [None] * len(flows)
+        if len(targets) != len(flows):
+            raise ValueError(f'Got {len(targets)} targets for {len(flows)} flows')
+        batch = FlowBatch()
+        batch.add_flows(flows, targets)
+        return self.validate_columns(batch)
+
+    def validate_columns(self, batch: FlowBatch) -> List[Dict]:
+        """Validate a prebuilt FlowBatch"""
+        np = _load_numpy() if len(batch.durations) >= VECTORIZE_MIN_POSES else None
+        if np is not None:
+            findings = self._check_vectorized(batch, np)
+        else:
+            findings = self._check_scalar(batch)
+        return self._build_reports(batch, findings)
+
+    def _known_mask(self, batch: FlowBatch) -> Optional[List[bool]]:
+        if self.rules.known_poses is None:
+            return None
+        return [name in self.rules.known_poses for name in batch.names]
+
+    def _check_vectorized(self, batch: FlowBatch, np) -> Dict:
+        rules = self.rules
+        n_flows = len(batch)
+        durations = np.frombuffer(batch.durations, dtype=np.int64) if batch.durations else np.zeros(0, np.int64)
+        pose_ids = np.frombuffer(batch.pose_ids, dtype=np.int64) if batch.pose_ids else np.zeros(0, np.int64)
+        segments = np.frombuffer(batch.segments, dtype=np.int8) if batch.segments else np.zeros(0, np.int8)
+        empty_cues = np.frombuffer(batch.empty_cues, dtype=np.int8) if batch.empty_cues else np.zeros(0, np.int8)
+        flow_index = np.frombuffer(batch.flow_index, dtype=np.int64) if batch.flow_index else np.zeros(0, np.int64)
+        starts = np.frombuffer(batch.flow_starts, dtype=np.int64)
+        targets = np.frombuffer(batch.targets, dtype=np.int64) if batch.targets else np.zeros(0, np.int64)
+
+        cumulative = np.concatenate(([0], np.cumsum(durations)))
+        totals = cumulative[starts[1:]] - cumulative[starts[:-1]]
+        counts = starts[1:] - starts[:-1]
+
+        # Structure: segments never go backwards and all three are present
+        out_of_order = np.zeros(n_flows, dtype=bool)
+        missing = np.zeros((n_flows, len(SEGMENTS)), dtype=bool)
+        if rules.require_structure:
+            segmented = segments >= 0
+            if len(segments) > 1:
+                same_flow = flow_index[1:] == flow_index[:-1]
+                backwards = same_flow & (segments[1:] < segments[:-1]) & segmented[1:] & segmented[:-1]
+                out_of_order[flow_index[1:][backwards]] = True
+            present = np.zeros((n_flows, len(SEGMENTS)), dtype=bool)
+            present[flow_index[segmented], segments[segmented]] = True
+            has_segments = np.zeros(n_flows, dtype=bool)
+            has_segments[flow_index[segmented]] = True
+            missing = ~present & has_segments[:, None]
+            unsegmented = np.nonzero(~has_segments & (counts > 0))[0].tolist()
+        else:
+            unsegmented = []
+
+        # Duplicates: count (flow, pose) pairs
+        duplicates = []
+        if len(pose_ids):
+            keys = flow_index * max(len(batch.names), 1) + pose_ids
+            unique_keys, key_counts = np.unique(keys, return_counts=True)
+            repeated = key_counts > rules.max_pose_repeats
+            for key, count in zip(unique_keys[repeated].tolist(), key_counts[repeated].tolist()):
+                flow_idx, pose_id = divmod(key, max(len(batch.names), 1))
+                duplicates.append((flow_idx, pose_id, count))
+
+        known = self._known_mask(batch)
+        unknown_positions: List[int] = []
+        if known is not None and len(pose_ids):
+            unknown = ~np.asarray(known, dtype=bool)[pose_ids]
+            unknown_positions = np.nonzero(unknown)[0].tolist()
+
+        return {
+            'totals': totals.tolist(),
+            'counts': counts.tolist(),
+            'off_target': np.nonzero((targets >= 0) & (np.abs(totals - targets) > rules.tolerance_seconds))[0].tolist(),
+            'too_short': np.nonzero(durations < rules.min_pose_seconds)[0].tolist(),
+            'too_long': np.nonzero(durations > rules.max_pose_seconds)[0].tolist(),
+            'empty_cues': np.nonzero(empty_cues)[0].tolist(),
+            'unknown': unknown_positions,
+            'out_of_order': np.nonzero(out_of_order)[0].tolist(),
+            'missing': {int(f): [SEGMENTS[s] for s in np.nonzero(missing[f])[0].tolist()]
+                        for f in np.nonzero(missing.any(axis=1))[0].tolist()},
+            'unsegmented': unsegmented,
+            'duplicates': duplicates,
+        }
+
+    def _check_scalar(self, batch: FlowBatch) -> Dict:
+        rules = self.rules
+        n_flows = len(batch)
+        starts = batch.flow_starts
+        totals = [0] * n_flows
+        too_short: List[int] = []
+        too_long: List[int] = []
+        empty_cues: List[int] = []
+        unknown: List[int] = []
+        out_of_order: Set[int] = set()
+        present = [[False] * len(SEGMENTS) for _ in range(n_flows)]
+        has_segments = [False] * n_flows
+        pair_counts: Dict[tuple, int] = {}
+        known = self._known_mask(batch)
+
+        previous_flow, previous_segment = -1, UNSEGMENTED
+        for pos, (flow_idx, duration, segment, pose_id, empty) in enumerate(zip(
+                batch.flow_index, batch.durations, batch.segments, batch.pose_ids, batch.empty_cues)):
+            totals[flow_idx] += duration
+            if duration < rules.min_pose_seconds:
+                too_short.append(pos)
+            elif duration > rules.max_pose_seconds:
+                too_long.append(pos)
+            if empty:
+                empty_cues.append(pos)
+            if known is not None and not known[pose_id]:
+                unknown.append(pos)
+            if rules.require_structure and segment >= 0:
+                has_segments[flow_idx] = True
+                present[flow_idx][segment] = True
+                if flow_idx == previous_flow and previous_segment >= 0 and segment < previous_segment:
+                    out_of_order.add(flow_idx)
+            pair = (flow_idx, pose_id)
+            pair_counts[pair] = pair_counts.get(pair, 0) + 1
+            previous_flow, previous_segment = flow_idx, segment
+
+        counts = [starts[i + 1] - starts[i] for i in range(n_flows)]
+        missing = {}
+        unsegmented = []
+        for flow_idx in range(n_flows):
+            if has_segments[flow_idx]:
+                gaps = [SEGMENTS[s] for s in range(len(SEGMENTS)) if not present[flow_idx][s]]
+                if gaps:
+                    missing[flow_idx] = gaps
+            elif rules.require_structure and counts[flow_idx]:
+                unsegmented.append(flow_idx)
+
+        return {
+            'totals': totals,
+            'counts': counts,
+            'off_target': [i for i, target in enumerate(batch.targets)
+                           if target >= 0 and abs(totals[i] - target) > rules.tolerance_seconds],
+            'too_short': too_short,
+            'too_long': too_long,
+            'empty_cues': empty_cues,
+            'unknown': unknown,
+            'out_of_order': sorted(out_of_order),
+            'missing': missing,
+            'unsegmented': unsegmented,
+            'duplicates': sorted((f, p, c) for (f, p), c in pair_counts.items() if c > rules.max_pose_repeats),
+        }
+
+    def _build_reports(self, batch: FlowBatch, findings: Dict) -> List[Dict]:
+        rules = self.rules
+        reports = [{
+            'valid': True,
+            'total_seconds': int(total),
+            'pose_count': int(count),
+            'errors': [],
+            'warnings': [],
+        } for total, count in zip(findings['totals'], findings['counts'])]
+
+        def pose_issue(pos: int, code: str, message: str) -> Tuple[int, Dict]:
+            flow_idx = batch.flow_index[pos]
+            return flow_idx, {
+                'code': code,
+                'message': message,
+                'pose': batch.names[batch.pose_ids[pos]],
+                'index': pos - batch.flow_starts[flow_idx],
+            }
+
+        def add(flow_idx: int, issue: Dict, level: str = 'errors') -> None:
+            reports[flow_idx][level].append(issue)
+            if level == 'errors':
+                reports[flow_idx]['valid'] = False
+
+        for flow_idx, report in enumerate(reports):
+            if report['pose_count'] == 0:
+                add(flow_idx, {'code': 'empty_flow', 'message': 'Flow has no poses'})
+        for flow_idx in findings['off_target']:
+            target = batch.targets[flow_idx]
+            add(flow_idx, {
+                'code': 'total_off_target',
+                'message': f"Total {reports[flow_idx]['total_seconds']}s is more than "
+                           f"{rules.tolerance_seconds}s away from target {target}s",
+            })
+        for pos in findings['too_short']:
+            add(*pose_issue(pos, 'pose_too_short',
+                            f'Pose shorter than {rules.min_pose_seconds}s ({batch.durations[pos]}s)'))
+        for pos in findings['too_long']:
+            add(*pose_issue(pos, 'pose_too_long',
+                            f'Pose longer than {rules.max_pose_seconds}s ({batch.durations[pos]}s)'))
+        for flow_idx in findings['out_of_order']:
+            add(flow_idx, {'code': 'segments_out_of_order',
+                           'message': 'Segments must run warmup, main, cooldown'})
+        for flow_idx, gaps in findings['missing'].items():
+            add(flow_idx, {'code': 'missing_segments',
+                           'message': f"Missing segments: {', '.join(gaps)}"})
+        for flow_idx in findings['unsegmented']:
+            add(flow_idx, {'code': 'unsegmented_flow',
+                           'message': 'Flow has no warmup/main/cooldown markers, so its structure was not checked'},
+                level='warnings')
+        for pos in findings['unknown']:
+            add(*pose_issue(pos, 'unknown_pose', 'Pose is not in the pose catalog'), level='warnings')
+        for pos in findings['empty_cues']:
+            add(*pose_issue(pos, 'empty_cue', 'Pose has no alignment cue'), level='warnings')
+        # Pose ids depend on the rest of the batch; order by name so a flow's report does not
+        for flow_idx, pose_id, count in sorted(findings['duplicates'], key=lambda d: (d[0], batch.names[d[1]])):
+            add(flow_idx, {
+                'code': 'duplicate_pose',
+                'message': f'Pose appears {count} times',
+                'pose': batch.names[pose_id],
+            }, level='warnings')
+
+        return reports
+
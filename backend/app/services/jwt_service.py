@@ -1,7 +1,10 @@
-import jwt
 import os
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Optional
+from ..utils.startup import lazy_import
+from .revocation_service import get_revocation_service
 
 class JWTService:
     """Service for handling JWT token operations"""
@@ -12,8 +15,10 @@ class JWTService:
         
         config_obj = config[os.getenv('FLASK_ENV', 'production')]
         self.secret_key = config_obj.JWT_SECRET_KEY
+        self.jwt = lazy_import('jwt')
         self.algorithm = 'HS256'
         self.access_token_expire_minutes = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 60))  # 1 hour default
+        self.refresh_token_expire_days = int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES_DAYS', 14))
     
     def create_access_token(self, user_data: Dict) -> str:
         """Create a JWT access token"""
@@ -28,23 +33,65 @@ class JWTService:
             'last_name': user_data.get('last_name'),
             'created_at': user_data.get('created_at'),
             'exp': expire,  # Expiration time
-            'iat': datetime.utcnow(),  # Issued at
+            'iat': time.time(),  # Issued at, to the microsecond so it orders against revocation cutoffs
+            'jti': uuid.uuid4().hex,  # Token id, used for revocation
             'type': 'access'
         }
         
         # Generate token
-        token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        token = self.jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
         return token
     
-    def verify_token(self, token: str) -> Optional[Dict]:
-        """Verify and decode a JWT token"""
+    def create_refresh_token(self, user_data: Dict) -> str:
+        """Create a long-lived JWT refresh token used to obtain new access tokens"""
+        payload = {
+            'user_id': user_data.get('id'),
+            'exp': datetime.utcnow() + timedelta(days=self.refresh_token_expire_days),
+            'iat': time.time(),
+            'jti': uuid.uuid4().hex,
+            'type': 'refresh'
+        }
+        return self.jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+    
+    def verify_token(self, token: str, token_type: str = 'access') -> Optional[Dict]:
+        """Verify and decode a JWT token, rejecting revoked tokens and the wrong token type"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
-        except jwt.ExpiredSignatureError:
+            payload = self.jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except self.jwt.ExpiredSignatureError:
             return None  # Token has expired
-        except jwt.InvalidTokenError:
+        except self.jwt.InvalidTokenError:
             return None  # Token is invalid
+        
+        if payload.get('type', 'access') != token_type:
+            return None
+        revocations = get_revocation_service()
+        if payload.get('jti') and revocations.is_revoked(payload['jti']):
+            return None  # Token has been revoked
+        if payload.get('user_id') and revocations.is_user_revoked(payload['user_id'], payload.get('iat', 0)):
+            return None  # All of the user's tokens were revoked (logout everywhere, deactivation)
+        return payload
+    
+    def revoke_token(self, payload: Dict) -> bool:
+        """Revoke a decoded token until its natural expiry"""
+        if not payload.get('jti'):
+            return False
+        expires_at = datetime.utcfromtimestamp(payload['exp'])
+        return get_revocation_service().revoke(payload['jti'], payload.get('user_id'), expires_at)
+    
+    def consume_refresh_token(self, payload: Dict) -> Optional[bool]:
+        """Revoke a refresh token so it can be exchanged only once.
+        
+        True if this call consumed it, False if it was already used, None if
+        the revocation could not be recorded.
+        """
+        if not payload.get('jti'):
+            return False
+        expires_at = datetime.utcfromtimestamp(payload['exp'])
+        return get_revocation_service().claim(payload['jti'], payload.get('user_id'), expires_at)
+    
+    def revoke_user_tokens(self, user_id: str) -> bool:
+        """Revoke every access and refresh token issued to a user so far"""
+        return get_revocation_service().revoke_user(user_id)
     
     def extract_user_from_token(self, token: str) -> Optional[Dict]:
         """Extract user information from a valid token"""
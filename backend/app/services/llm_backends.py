@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from ..utils.startup import register_after_fork
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'llm_recordings.sqlite3')
+
+
+@dataclass
+class LLMCompletion:
+    """Text and token usage returned by a backend"""
+    content: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when no recording exists for a request"""
+
+
+def request_key(model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+    """Hash everything that determines a completion into a stable key"""
+    payload = json.dumps([model, temperature, max_tokens, messages], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CompletionStore:
+    """SQLite store of zlib-compressed completions, keyed by request hash.
+
+    A key can hold several recordings (ordinal 0, 1, ...) because the same
+    prompt is legitimately sent more than once, e.g. retries and top-ups.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode so append can open its own BEGIN IMMEDIATE transaction
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS completions ('
+            ' key TEXT NOT NULL, ordinal INTEGER NOT NULL, model TEXT, temperature REAL,'
+            ' content BLOB NOT NULL, usage TEXT, created_at REAL,'
+            ' PRIMARY KEY (key, ordinal))'
+        )
+
+    def append(self, key: str, model: str, temperature: float, completion: LLMCompletion) -> None:
+        content = zlib.compress(completion.content.encode())
+        with self._lock:
+            # Several workers may record into the same file: take the write lock
+            # before reading the next ordinal so two writers never pick the same one
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'INSERT INTO completions'
+                    ' SELECT ?, COALESCE(MAX(ordinal) + 1, 0), ?, ?, ?, ?, ? FROM completions WHERE key = ?',
+                    (key, model, temperature, content, json.dumps(completion.usage), time.time(), key)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def load(self, key: str) -> List[LLMCompletion]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT content, usage FROM completions WHERE key = ? ORDER BY ordinal', (key,)
+            ).fetchall()
+        return [LLMCompletion(zlib.decompress(content).decode(), json.loads(usage or '{}'))
+                for content, usage in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class LiveBackend:
+    """Call OpenAI chat completions"""
+
+    # Whether completions cost real tokens and count towards usage and quotas
+    bills_usage = True
+
+    def __init__(self, client_factory: Callable):
+        self.client = client_factory()
+
+    def complete(self, model: str, messages: List[Dict], max_tokens: int, temperature: float) -> LLMCompletion:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        usage = getattr(response, 'usage', None)
+        return LLMCompletion(
+            content=response.choices[0].message.content,
+            usage={
+                'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+                'total_tokens': getattr(usage, 'total_tokens', 0) or 0,
+            } if usage else {}
+        )
+
+
+class RecordingBackend:
+    """Call the live backend and store every prompt/completion pair"""
+
+    bills_usage = True
+
+    def __init__(self, inner: LiveBackend, store: CompletionStore):
+        self.inner = inner
+        self.store = store
+
+    def complete(self, model: str, messages: List[Dict], max_tokens: int, temperature: float) -> LLMCompletion:
+        completion = self.inner.complete(model, messages, max_tokens, temperature)
+        try:
+            self.store.append(request_key(model, messages, temperature, max_tokens), model, temperature, completion)
+        except Exception as e:
+            # The call is already paid for; a lost recording must not fail the request
+            print(f"⚠️  WARNING: Could not record LLM completion: {e}")
+        return completion
+
+
+class ReplayBackend:
+    """Serve recorded completions, optionally sleeping to simulate API latency"""
+
+    # Replays make no API call, so load tests and replays leave usage and quotas alone
+    bills_usage = False
+
+    def __init__(self, store: CompletionStore, latency_seconds: float = 0.0):
+        self.store = store
+        self.latency_seconds = latency_seconds
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def complete(self, model: str, messages: List[Dict], max_tokens: int, temperature: float) -> LLMCompletion:
+        key = request_key(model, messages, temperature, max_tokens)
+        recordings = self.store.load(key)
+        if not recordings:
+            raise ReplayMissError(f'No recorded completion for request {key[:12]}')
+        # Repeated identical requests cycle through recordings in the order they were made
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+        return recordings[cursor % len(recordings)]
+
+
+_stores: Dict[str, CompletionStore] = {}
+_replay_backends: Dict[str, ReplayBackend] = {}
+
+
+def _reset_after_fork() -> None:
+    # SQLite connections must not be shared across fork
+    _stores.clear()
+    _replay_backends.clear()
+
+
+register_after_fork(_reset_after_fork)
+
+
+def get_store(path: str) -> CompletionStore:
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = CompletionStore(path)
+    return store
+
+
+def create_llm_backend(client_factory: Callable, mode: Optional[str] = None):
+    """Build the backend selected by LLM_BACKEND_MODE (live, record or replay)"""
+    mode = (mode or os.getenv('LLM_BACKEND_MODE', 'live')).lower()
+    path = os.getenv('LLM_RECORDINGS_PATH', DEFAULT_STORE_PATH)
+
+    if mode == 'record':
+        return RecordingBackend(LiveBackend(client_factory), get_store(path))
+    if mode == 'replay':
+        # Shared per process so replay cursors advance across requests
+        backend = _replay_backends.get(path)
+        if backend is None:
+            latency = float(os.getenv('LLM_REPLAY_LATENCY_MS', '0')) / 1000
+            backend = _replay_backends[path] = ReplayBackend(get_store(path), latency)
+        return backend
+    return LiveBackend(client_factory)
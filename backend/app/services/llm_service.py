@@ -1,18 +1,43 @@
-from openai import OpenAI
 import json
 import os
 import re
 import ast
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from ..utils.startup import lazy_import
+from ..models.flow import Flow, PoseStep
+from .flow_validator import FlowValidator, ValidationRules
+from .llm_backends import create_llm_backend
+from .pose_catalog import get_pose_catalog
+from .usage_service import get_usage_accountant
+from .cue_store import get_cue_store
+
+# Poses named in a lean prompt; caps the prompt growth as the cue store fills up
+LEAN_PROMPT_MAX_POSES = 120
 
 class LLMService:
     """Service for generating yoga flows using OpenAI"""
     
-    def __init__(self):
+    def __init__(self, user_id: Optional[str] = None):
+        self.model = "gpt-3.5-turbo"  
+        # Token usage is charged to this user (anonymous when None)
+        self.user_id = user_id
+        self.usage = get_usage_accountant()
+        # 'lean' asks the model only for pose and duration where a stored cue exists
+        self.generation_mode = os.getenv('LLM_GENERATION_MODE', 'full').lower()
+        self.cue_store = get_cue_store()
+        # live, record or replay (see llm_backends); replay never creates an OpenAI client
+        self.backend = create_llm_backend(self._create_client)
+        catalog = get_pose_catalog()
+        self.validator = FlowValidator(ValidationRules(
+            tolerance_seconds=300,
+            known_poses=catalog if catalog is not None and len(catalog) else None
+        ))
+    
+    def _create_client(self):
         # Configure a reasonable network timeout to avoid long hangs
         client_timeout = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '30'))
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=client_timeout)
-        self.model = "gpt-3.5-turbo"  
+        OpenAI = lazy_import('openai').OpenAI
+        return OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=client_timeout)
     
     def generate_yoga_flow(self, flow_request: Dict) -> Dict:
         """Generate a yoga flow based on user requirements"""
@@ -26,59 +51,38 @@ class LLMService:
         try:
             # First attempt
             ai_response = self._call_llm(base_prompt)
-            flow_data = self._parse_flow_response(ai_response)
-
-            # Preserve segments if available; otherwise treat all as MAIN
-            warm = flow_data.get('warmup', []) if isinstance(flow_data, dict) else []
-            main = flow_data.get('main', []) if isinstance(flow_data, dict) else []
-            cool = flow_data.get('cooldown', []) if isinstance(flow_data, dict) else []
-            if not (warm or main or cool):
-                main = flow_data.get('sequence', []) or []
-
-            def combined_total() -> int:
-                return self._sum_sequence_duration([*warm, *main, *cool])
-
-            total = combined_total()
+            flow = self._parse_flow_response(ai_response)
 
             # If too high beyond tolerance, try one more full generation
-            if total - target_seconds > tolerance_seconds:
+            if flow.total_seconds - target_seconds > tolerance_seconds:
                 retry_response = self._call_llm(base_prompt)
-                flow_data = self._parse_flow_response(retry_response)
-                warm = flow_data.get('warmup', [])
-                main = flow_data.get('main', [])
-                cool = flow_data.get('cooldown', [])
-                if not (warm or main or cool):
-                    main = flow_data.get('sequence', []) or []
-                total = combined_total()
+                flow = self._parse_flow_response(retry_response)
 
             # If too low, iteratively top up MAIN routine until within tolerance
             attempts = 0
             max_attempts = 5
-            used_pose_names = [s.get('pose') for s in [*warm, *main, *cool] if isinstance(s, dict)]
-            while (target_seconds - total) > tolerance_seconds and attempts < max_attempts:
-                deficit = max(0, target_seconds - total)
+            used_pose_names = flow.pose_names()
+            used_pose_names += flow_request.get('avoidPoses') or []
+            while (target_seconds - flow.total_seconds) > tolerance_seconds and attempts < max_attempts:
+                deficit = max(0, target_seconds - flow.total_seconds)
                 topup_prompt = self._create_topup_prompt(flow_request, deficit, used_pose_names)
                 topup_response = self._call_llm(topup_prompt)
-                additions = self._parse_sequence_array(topup_response)
+                additions = [step for step in map(PoseStep.from_dict, self._parse_sequence_array(topup_response))
+                             if step is not None and step.pose]
+                self._apply_cues(additions)
                 # Insert additions into MAIN before cooldown
-                for item in additions:
-                    if isinstance(item, dict) and item.get('pose'):
-                        normalized = {
-                            'pose': item.get('pose'),
-                            'duration': int(float(item.get('duration', 0))) if str(item.get('duration', '')).strip() != '' else 0,
-                            'description': item.get('description') or ''
-                        }
-                        main.append(normalized)
-                        used_pose_names.append(normalized['pose'])
-                total = combined_total()
+                for step in additions:
+                    flow.append(step, 'main')
+                    used_pose_names.append(step.pose)
                 attempts += 1
 
-            final_sequence = [*warm, *main, *cool]
-            if final_sequence and abs(total - target_seconds) <= tolerance_seconds:
+            total = flow.total_seconds
+            if len(flow) and abs(total - target_seconds) <= tolerance_seconds:
                 return {
                     'success': True,
-                    'flow_description': flow_data.get('description', ''),
-                    'flow_sequence': final_sequence,
+                    'flow_description': flow.description,
+                    'flow_sequence': flow.to_sequence(),
+                    'validation': self.validator.validate(flow, target_seconds),
                     'raw_response': ai_response
                 }
 
@@ -101,6 +105,12 @@ class LLMService:
         duration = flow_request.get('timeLength', '30')
         description = flow_request.get('description', '')
         desired_poses = flow_request.get('desiredPoses', '')
+        program_context = self._create_program_context(flow_request)
+        lean_poses = self._lean_pose_names()
+        cue_rule = (
+            "- Each pose NOT listed under Stored Cues MUST include 1–3 short, concrete alignment sentences"
+            if lean_poses else "- Each pose MUST include 1–3 short, concrete alignment sentences"
+        )
         
         prompt = f"""
 Create a detailed yoga flow with the following specifications:
@@ -109,7 +119,7 @@ Create a detailed yoga flow with the following specifications:
 **Duration:** {duration} minutes - IT IS VERY IMPORTANT TO FOLLOW THE DURATION OF THE FLOW. DO NOT RETURN A FLOW WHERE THE SUM OF THE TIMES IS SIGNIFICANTLY DIFFERENT THAN THE DURATION.
 **User Description:** {description}
 **Desired Poses:** {desired_poses if desired_poses else 'No specific poses requested'}
-
+{program_context}
 Please provide your response in the following EXACT format:
 
 **FLOW_DESCRIPTION:**
@@ -117,26 +127,26 @@ Please provide your response in the following EXACT format:
 
 **WARMUP_SEQUENCE:**
 [
-  {{"pose": "Pose Name", "duration": 60, "description": "Concrete body setup and entry cues."}}
+  {self._sequence_item_example(60, "Concrete body setup and entry cues.", lean_poses)}
 ]
 
 **MAIN_SEQUENCE:**
 [
-  {{"pose": "Pose Name", "duration": 45, "description": "Concrete alignment and key actions."}}
+  {self._sequence_item_example(45, "Concrete alignment and key actions.", lean_poses)}
 ]
 
 **COOLDOWN_SEQUENCE:**
 [
-  {{"pose": "Pose Name", "duration": 60, "description": "Gentle alignment and release cues."}}
+  {self._sequence_item_example(60, "Gentle alignment and release cues.", lean_poses)}
 ]
-
+{self._create_lean_instructions(lean_poses)}
 Guidelines:
 - Create a balanced sequence appropriate for the duration. - IT IS VERY IMPORTANT TO FOLLOW THE DURATION OF THE FLOW. DO NOT RETURN A FLOW WHERE THE SUM OF THE TIMES IS SIGNIFICANTLY DIFFERENT THAN THE DURATION.
 - Include warm-up poses at the beginning
 - Progress from easier to more challenging poses in MAIN
 - Include cool-down poses at the end
 - Each pose should have a duration in seconds
-- Each pose MUST include 1–3 short, concrete alignment sentences giving exact body orientation and key actions (joint stacking, limb positions, spinal shape, weight distribution, engagement, and gaze)
+{cue_rule} giving exact body orientation and key actions (joint stacking, limb positions, spinal shape, weight distribution, engagement, and gaze)
 - Use clear imperative cues (e.g., "stack", "press", "draw") and avoid vague wording like "feel", "focus", or generic benefits
 - Prioritize setup/entry and alignment; do not include philosophy or long benefits in the pose descriptions
 - There are no limits on how many poses you can include in the flow. Please to not limit yourself. It is preffered that the flow has more poses rather than few poses for longer durations.
@@ -149,8 +159,26 @@ Guidelines:
         
         return prompt
 
+    def _create_program_context(self, flow_request: Dict) -> str:
+        """Extra prompt lines for sessions generated as part of a multi-session program"""
+        if not flow_request.get('sessionCount'):
+            return ''
+
+        lines = [
+            f"**Program Session:** {flow_request.get('sessionNumber')} of {flow_request.get('sessionCount')}",
+            f"**Intensity:** {flow_request.get('intensity', 'moderate')}",
+            f"**Session Focus:** {flow_request.get('focus', 'balanced practice')}",
+        ]
+        focus_poses = [p for p in flow_request.get('focusPoses') or [] if p]
+        if focus_poses:
+            lines.append(f"**Session Pose Pool (build the MAIN sequence mainly from these):** {', '.join(focus_poses)}")
+        avoid_poses = [p for p in flow_request.get('avoidPoses') or [] if p]
+        if avoid_poses:
+            lines.append(f"**Poses used in other sessions (prefer different ones):** {', '.join(avoid_poses)}")
+        return '\n'.join(lines) + '\n'
+
     def _call_llm(self, prompt: str) -> str:
-        response = self.client.chat.completions.create(
+        completion = self.backend.complete(
             model=self.model,
             messages=[
                 {
@@ -165,7 +193,39 @@ Guidelines:
             max_tokens=1200,
             temperature=0.7
         )
-        return response.choices[0].message.content
+        if self.backend.bills_usage:
+            self.usage.record(self.user_id, completion.usage)
+        return completion.content
+
+    def _lean_pose_names(self) -> List[str]:
+        """Poses the model may return without a description (empty outside lean mode)"""
+        if self.generation_mode != 'lean':
+            return []
+        return self.cue_store.pose_names(LEAN_PROMPT_MAX_POSES)
+
+    def _sequence_item_example(self, duration: int, cue_hint: str, lean_poses: List[str]) -> str:
+        if lean_poses:
+            return f'{{"pose": "Pose Name", "duration": {duration}}}'
+        return f'{{"pose": "Pose Name", "duration": {duration}, "description": "{cue_hint}"}}'
+
+    def _create_lean_instructions(self, lean_poses: List[str]) -> str:
+        """Prompt lines that let the model skip cues we already have"""
+        if not lean_poses:
+            return ''
+        return (
+            f"**Stored Cues:** {', '.join(lean_poses)}\n"
+            "For poses listed under Stored Cues, return ONLY \"pose\" and \"duration\" (use the listed name exactly). "
+            "For any other pose, also include a \"description\" with 1–3 short, concrete alignment cues.\n"
+        )
+
+    def _apply_cues(self, steps) -> None:
+        """Remember cues the model wrote, then fill in the ones it left out (best-effort)"""
+        try:
+            self.cue_store.learn(steps)
+            self.cue_store.fill(steps)
+        except Exception as e:
+            # Steps keep whatever descriptions the model gave them
+            print(f"⚠️  WARNING: Could not apply stored cues: {e}")
 
     def _create_topup_prompt(self, flow_request: Dict, deficit_seconds: int, used_pose_names: List[str]) -> str:
         routine_name = flow_request.get('routineName', 'Custom Flow')
@@ -173,6 +233,7 @@ Guidelines:
         desired_poses = flow_request.get('desiredPoses', '')
 
         used_list = ', '.join([p for p in used_pose_names if p]) or 'None'
+        lean_poses = self._lean_pose_names()
         return f"""
 We need to extend ONLY the MAIN routine of the existing flow.
 Add additional poses whose total duration is as close as possible to {deficit_seconds} seconds (do not exceed by more than 300 seconds). Prefer batches totalling 120–240 seconds to reduce response size; you may be called repeatedly.
@@ -180,8 +241,8 @@ Add additional poses whose total duration is as close as possible to {deficit_se
 Avoid repeating too many poses. Poses already used: {used_list}
 
 Respond with ONLY a JSON array (no prose, no code fences) where each item is:
-{{"pose": "Pose Name", "duration": 30, "description": "Concrete alignment/entry cues."}}
-"""
+{self._sequence_item_example(30, "Concrete alignment/entry cues.", lean_poses)}
+{self._create_lean_instructions(lean_poses)}"""
 
     def _parse_sequence_array(self, text: str) -> List[Dict]:
         """Extract the first JSON-like array of dicts from arbitrary text."""
@@ -205,31 +266,17 @@ Respond with ONLY a JSON array (no prose, no code fences) where each item is:
             except Exception:
                 return []
 
-    def _sum_sequence_duration(self, sequence: List[Dict]) -> int:
-        total = 0
-        for item in sequence:
-            try:
-                total += int(float(item.get('duration', 0)))
-            except Exception:
-                continue
-        return total
-    
-    def _parse_flow_response(self, response: str) -> Dict:
-        """Parse the AI response to extract structured data.
+    def _parse_flow_response(self, response: str) -> Flow:
+        """Parse the AI response into a Flow.
 
         Supports both the legacy single **FLOW_SEQUENCE:** array format and the
         new split format: **WARMUP_SEQUENCE:**, **MAIN_SEQUENCE:**, **COOLDOWN_SEQUENCE:**.
-        Returns a combined 'sequence' list.
+        Legacy sequences are placed in the MAIN segment.
         """
         
         try:
             # First, extract description
             description = re.split(r"\*\*FLOW_DESCRIPTION:\*\*", response)
-            if len(description) > 1:
-                # everything after marker until next marker
-                after_desc = description[1]
-            else:
-                after_desc = response
 
             # Try split-format sequences
             warm_text = re.split(r"\*\*WARMUP_SEQUENCE:\*\*", response)
@@ -273,69 +320,22 @@ Respond with ONLY a JSON array (no prose, no code fences) where each item is:
             if len(cool_text) > 1:
                 cool_seq = load_array(extract_first_array(cool_text[1]))
 
-            sequence_raw: List[Dict]
-            if warm_seq or main_seq or cool_seq:
-                sequence_raw = [*warm_seq, *main_seq, *cool_seq]
-            else:
+            if not (warm_seq or main_seq or cool_seq):
                 # Fallback: legacy **FLOW_SEQUENCE:** format
                 parts = response.split('**FLOW_SEQUENCE:**')
                 sequence_part = parts[1].strip() if len(parts) >= 2 else ''
-                sequence_raw = load_array(extract_first_array(sequence_part))
-
-            # Normalize items
-            normalized: List[Dict] = []
-            for item in sequence_raw or []:
-                if not isinstance(item, dict):
-                    continue
-                pose = item.get('pose') or item.get('name') or ''
-                raw_dur = item.get('duration', 0)
-                try:
-                    duration = int(float(raw_dur))
-                except Exception:
-                    duration = 0
-                pose_desc = item.get('description') or item.get('cue') or item.get('cues') or ''
-                normalized.append({
-                    'pose': pose,
-                    'duration': duration,
-                    'description': pose_desc,
-                })
-
-            # Description clean
-            description = description_text.replace('**', '').strip()
-            sequence = normalized
-
-            # Also return split segments if present to allow precise insertion
-            result: Dict = {
-                'description': description,
-                'sequence': sequence
-            }
-            if warm_seq or main_seq or cool_seq:
-                # Provide normalized split lists
-                def norm(seq: List[Dict]) -> List[Dict]:
-                    out: List[Dict] = []
-                    for item in seq or []:
-                        if not isinstance(item, dict):
-                            continue
-                        pose = item.get('pose') or item.get('name') or ''
-                        try:
-                            duration = int(float(item.get('duration', 0)))
-                        except Exception:
-                            duration = 0
-                        out.append({
-                            'pose': pose,
-                            'duration': duration,
-                            'description': item.get('description') or ''
-                        })
-                    return out
-                result['warmup'] = norm(warm_seq)
-                result['main'] = norm(main_seq)
-                result['cooldown'] = norm(cool_seq)
-            
-            return result
+                main_seq = load_array(extract_first_array(sequence_part))
+
+            # Normalize items once, straight into their segments
+            flow = Flow(description=description_text.replace('**', '').strip())
+            flow.extend(warm_seq, 'warmup')
+            flow.extend(main_seq, 'main')
+            flow.extend(cool_seq, 'cooldown')
             
         except Exception as e:
             # Fallback: return the raw response as description
-            return {
-                'description': response,
-                'sequence': []
-            }
+            return Flow(description=response)
+        
+        # Outside the parse fallback: a cue problem must not discard a parsed flow
+        self._apply_cues(flow)
+        return flow
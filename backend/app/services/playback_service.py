@@ -0,0 +1,155 @@
+import asyncio
+import heapq
+import itertools
+import uuid
+from typing import Dict, List, Optional, Tuple
+from .session_timeline import SessionTimeline
+
+
+class PlaybackSession:
+    """State of one live session; timing is owned by PlaybackScheduler"""
+
+    __slots__ = ('id', 'timeline', 'queue', 'anchor', 'paused_elapsed',
+                 'next_event', 'generation', 'finished')
+
+    def __init__(self, timeline: SessionTimeline):
+        self.id = uuid.uuid4().hex
+        self.timeline = timeline
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.anchor = 0.0  # loop time corresponding to offset 0
+        self.paused_elapsed: Optional[float] = None
+        self.next_event = 0
+        self.generation = 0  # bumped on pause/resume/stop to invalidate heap entries
+        self.finished = False
+
+    @property
+    def paused(self) -> bool:
+        return self.paused_elapsed is not None
+
+    def elapsed(self, now: float) -> float:
+        if self.paused_elapsed is not None:
+            return self.paused_elapsed
+        return now - self.anchor
+
+
+class PlaybackScheduler:
+    """Drive every live session from one event loop with a single timer heap.
+
+    The heap holds at most one live entry per session: the absolute loop time
+    of that session's next event. One ``loop.call_at`` handle is armed for the
+    earliest deadline, so thousands of sessions cost one timer, not one task
+    or sleep each. Deadlines are computed from each session's anchor rather
+    than by chaining relative sleeps, so lateness never accumulates.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.sessions: Dict[str, PlaybackSession] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_deadline: Optional[float] = None
+        self._stale_entries = 0
+        self.max_drift = 0.0
+        self.events_sent = 0
+
+    def start(self, timeline: SessionTimeline) -> PlaybackSession:
+        """Register a session and start playing from the beginning"""
+        session = PlaybackSession(timeline)
+        session.anchor = self.loop.time()
+        self.sessions[session.id] = session
+        self._schedule(session)
+        return session
+
+    def pause(self, session: PlaybackSession) -> None:
+        if session.paused or session.finished:
+            return
+        session.paused_elapsed = self.loop.time() - session.anchor
+        self._invalidate(session)
+        session.queue.put_nowait({'type': 'paused', 'elapsed': round(session.paused_elapsed, 3)})
+
+    def resume(self, session: PlaybackSession) -> None:
+        if not session.paused or session.finished:
+            return
+        elapsed = session.paused_elapsed
+        session.anchor = self.loop.time() - elapsed
+        session.paused_elapsed = None
+        session.queue.put_nowait({'type': 'resumed', 'elapsed': round(elapsed, 3)})
+        self._schedule(session)
+
+    def stop(self, session: PlaybackSession) -> None:
+        self._invalidate(session)
+        session.finished = True
+        self.sessions.pop(session.id, None)
+
+    def _invalidate(self, session: PlaybackSession) -> None:
+        # Heap entries are removed lazily: a generation mismatch marks them stale
+        session.generation += 1
+        self._stale_entries += 1
+        if self._stale_entries > 64 and self._stale_entries > len(self._heap) // 2:
+            self._compact()
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap
+                      if entry[2] in self.sessions and self.sessions[entry[2]].generation == entry[3]]
+        heapq.heapify(self._heap)
+        self._stale_entries = 0
+
+    def _schedule(self, session: PlaybackSession) -> None:
+        timeline = session.timeline
+        if session.next_event >= len(timeline.event_offsets):
+            return
+        deadline = session.anchor + timeline.event_offsets[session.next_event]
+        heapq.heappush(self._heap, (deadline, next(self._counter), session.id, session.generation))
+        if self._timer_deadline is None or deadline < self._timer_deadline:
+            self._arm(deadline)
+
+    def _arm(self, deadline: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_at(deadline, self._on_timer)
+        self._timer_deadline = deadline
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._timer_deadline = None
+        now = self.loop.time()
+        heap = self._heap
+
+        while heap and heap[0][0] <= now:
+            deadline, _, session_id, generation = heapq.heappop(heap)
+            session = self.sessions.get(session_id)
+            if session is None or session.generation != generation:
+                self._stale_entries = max(0, self._stale_entries - 1)
+                continue
+            self.max_drift = max(self.max_drift, now - deadline)
+            self._fire_due(session, now)
+
+        if heap:
+            self._arm(heap[0][0])
+
+    def _fire_due(self, session: PlaybackSession, now: float) -> None:
+        timeline = session.timeline
+        elapsed = session.elapsed(now)
+        offsets = timeline.event_offsets
+        # Emit every event that is due; normally one, more if the loop stalled
+        while session.next_event < len(offsets) and offsets[session.next_event] <= elapsed + 1e-6:
+            payload = timeline.event_payload(session.next_event)
+            payload['elapsed'] = round(elapsed, 3)
+            session.queue.put_nowait(payload)
+            self.events_sent += 1
+            session.next_event += 1
+
+        if session.next_event >= len(offsets):
+            session.finished = True
+            self.sessions.pop(session.id, None)
+        else:
+            self._schedule(session)
+
+    def stats(self) -> Dict:
+        return {
+            'sessions': len(self.sessions),
+            'heap_size': len(self._heap),
+            'events_sent': self.events_sent,
+            'max_drift_ms': round(self.max_drift * 1000, 3),
+        }
@@ -0,0 +1,217 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from .flow_validator import canonical_pose_name
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+DEFAULT_JSON_PATH = os.path.join(DATA_DIR, 'poses_database.json')
+DEFAULT_BINARY_PATH = os.path.join(DATA_DIR, 'poses_catalog.bin')
+
+# Binary layout (little-endian):
+#   header   MAGIC, version, field count, record count, section offsets, source size/mtime
+#   fields   per field: u16 length + UTF-8 name ("_key" is always field 0)
+#   records  record count x field count x (u32 heap offset, u32 length)
+#   index    record count x u32 record id, sorted by canonical name
+#   heap     UTF-8 values; the top bit of a length marks a JSON-encoded value
+MAGIC = b'YFPC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIQQ')
+SLOT = struct.Struct('<II')
+INDEX_ENTRY = struct.Struct('<I')
+JSON_FLAG = 0x80000000
+KEY_FIELD = '_key'
+NAME_FIELDS = ('name', 'english_name', 'pose')
+
+logger = logging.getLogger(__name__)
+
+
+def _source_stamp(json_path: str):
+    stat = os.stat(json_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _pose_name(pose: Dict) -> str:
+    for field in NAME_FIELDS:
+        if pose.get(field):
+            return str(pose[field])
+    return ''
+
+
+def build_pose_catalog(json_path: str = DEFAULT_JSON_PATH, binary_path: str = DEFAULT_BINARY_PATH) -> int:
+    """Compile poses_database.json into the binary catalog; returns the pose count"""
+    with open(json_path) as f:
+        data = json.load(f)
+    poses = [pose for pose in data.get('poses', []) if isinstance(pose, dict) and _pose_name(pose)]
+
+    fields = [KEY_FIELD] + sorted({field for pose in poses for field in pose})
+    heap = bytearray()
+    slots = bytearray()
+    keys = []
+    for pose in poses:
+        key = canonical_pose_name(_pose_name(pose))
+        keys.append(key.encode())
+        for field in fields:
+            value = key if field == KEY_FIELD else pose.get(field)
+            if value is None:
+                slots += SLOT.pack(0, 0)
+                continue
+            if isinstance(value, str):
+                encoded, flag = value.encode(), 0
+            else:
+                encoded, flag = json.dumps(value, separators=(',', ':')).encode(), JSON_FLAG
+            slots += SLOT.pack(len(heap), len(encoded) | flag)
+            heap += encoded
+
+    order = sorted(range(len(poses)), key=lambda i: keys[i])
+    field_table = b''.join(struct.pack('<H', len(name.encode())) + name.encode() for name in fields)
+    records_offset = HEADER.size + len(field_table)
+    index_offset = records_offset + len(slots)
+    heap_offset = index_offset + INDEX_ENTRY.size * len(order)
+    size, mtime_ns = _source_stamp(json_path)
+
+    tmp_path = f'{binary_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(fields), len(poses), records_offset,
+                            index_offset, heap_offset, size, mtime_ns))
+        f.write(field_table)
+        f.write(slots)
+        f.write(b''.join(INDEX_ENTRY.pack(i) for i in order))
+        f.write(heap)
+    # Atomic swap so concurrently starting workers never see a partial file
+    os.replace(tmp_path, binary_path)
+    return len(poses)
+
+
+class PoseCatalog:
+    """Read-only view over the binary pose catalog.
+
+    The file is memory-mapped, so every worker shares the same page-cache
+    copy and opening it costs the same regardless of catalog size. Lookups
+    binary-search the name index and decode only the requested fields.
+    """
+
+    def __init__(self, path: str = DEFAULT_BINARY_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self._mm is None or len(self._mm) < HEADER.size:
+            raise ValueError(f'Pose catalog {path} is empty or truncated')
+
+        (magic, version, field_count, self._count, self._records_offset, self._index_offset,
+         self._heap_offset, self.source_size, self.source_mtime_ns) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Pose catalog {path} has an unsupported format')
+
+        self.fields: List[str] = []
+        offset = HEADER.size
+        for _ in range(field_count):
+            (length,) = struct.unpack_from('<H', self._mm, offset)
+            self.fields.append(self._mm[offset + 2:offset + 2 + length].decode())
+            offset += 2 + length
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+        self._record_size = SLOT.size * field_count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) is not None
+
+    def _read(self, record: int, field_number: int) -> Any:
+        offset, length = SLOT.unpack_from(
+            self._mm, self._records_offset + record * self._record_size + field_number * SLOT.size)
+        if length == 0:
+            return None
+        is_json = length & JSON_FLAG
+        start = self._heap_offset + offset
+        raw = self._mm[start:start + (length & ~JSON_FLAG)]
+        return json.loads(raw) if is_json else raw.decode()
+
+    def _read_key(self, record: int) -> bytes:
+        offset, length = SLOT.unpack_from(self._mm, self._records_offset + record * self._record_size)
+        start = self._heap_offset + offset
+        return self._mm[start:start + length]
+
+    def _find(self, name: str) -> Optional[int]:
+        key = canonical_pose_name(name).encode()
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            (record,) = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + mid * INDEX_ENTRY.size)
+            candidate = self._read_key(record)
+            if candidate < key:
+                low = mid + 1
+            elif candidate > key:
+                high = mid
+            else:
+                return record
+        return None
+
+    def get(self, name: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """Look up a pose by name, decoding only ``fields`` (all fields if None)"""
+        record = self._find(name)
+        if record is None:
+            return None
+        wanted = self.fields[1:] if fields is None else fields
+        result = {}
+        for field in wanted:
+            number = self._field_index.get(field)
+            if number is not None:
+                value = self._read(record, number)
+                if value is not None:
+                    result[field] = value
+        return result
+
+    def canonical_names(self) -> Iterator[str]:
+        """Iterate canonical pose names in sorted order"""
+        for position in range(self._count):
+            (record,) = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + position * INDEX_ENTRY.size)
+            yield self._read_key(record).decode()
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+_catalog: Optional[PoseCatalog] = None
+# Set once loading has failed, so a missing or corrupt catalog is reported once, not per LLMService
+_catalog_failed = False
+_catalog_lock = threading.Lock()
+
+
+def _is_stale(json_path: str, binary_path: str) -> bool:
+    if not os.path.exists(binary_path):
+        return True
+    try:
+        with open(binary_path, 'rb') as f:
+            header = f.read(HEADER.size)
+        _, _, _, _, _, _, _, size, mtime_ns = HEADER.unpack(header)
+    except (OSError, struct.error):
+        return True
+    return (size, mtime_ns) != _source_stamp(json_path)
+
+
+def get_pose_catalog(json_path: str = DEFAULT_JSON_PATH,
+                     binary_path: str = DEFAULT_BINARY_PATH) -> Optional[PoseCatalog]:
+    """Return the process-wide catalog, compiling it first if missing or out of date.
+
+    Returns None if the catalog cannot be loaded; the failure is remembered
+    for the life of the process (restart after fixing the data files).
+    """
+    global _catalog, _catalog_failed
+    if _catalog is not None or _catalog_failed:
+        return _catalog
+    with _catalog_lock:
+        if _catalog is None and not _catalog_failed:
+            try:
+                if os.path.exists(json_path) and _is_stale(json_path, binary_path):
+                    build_pose_catalog(json_path, binary_path)
+                _catalog = PoseCatalog(binary_path)
+            except (OSError, ValueError, struct.error) as e:
+                _catalog_failed = True
+                logger.warning("Pose catalog unavailable, continuing without it: %s", e)
+    return _catalog
@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+from .llm_service import LLMService
+
+INTENSITY_LEVELS = ['gentle', 'moderate', 'steady', 'strong', 'peak']
+
+DEFAULT_FOCUSES = [
+    'hips and hamstrings',
+    'core strength and balance',
+    'spinal mobility and twists',
+    'shoulders and heart-opening backbends',
+    'standing strength and stamina',
+    'lateral stretches and side body',
+    'restorative release',
+]
+
+# Disjoint main-sequence pose pools for the default focuses. Sessions run
+# concurrently, so variety comes from assigning pools up front rather than
+# from what earlier sessions happened to return.
+FOCUS_POSE_POOLS = {
+    'hips and hamstrings': ['Lizard', 'Pigeon', 'Half Splits', 'Wide-Legged Forward Fold',
+                            'Low Lunge', 'Reclined Hand-to-Big-Toe'],
+    'core strength and balance': ['Boat', 'Forearm Plank', 'Side Plank', 'Tree',
+                                  'Warrior III', 'Eagle'],
+    'spinal mobility and twists': ['Cat-Cow', 'Revolved Chair', 'Revolved Crescent Lunge',
+                                   'Half Lord of the Fishes', 'Thread the Needle', 'Reclined Twist'],
+    'shoulders and heart-opening backbends': ['Cobra', 'Sphinx', 'Camel', 'Bridge',
+                                              'Puppy', 'Cow Face Arms'],
+    'standing strength and stamina': ['Chair', 'Warrior I', 'Warrior II', 'Crescent Lunge',
+                                      'Goddess', 'Triangle'],
+    'lateral stretches and side body': ['Extended Side Angle', 'Gate', 'Half Moon',
+                                        'Crescent Moon', 'Reverse Warrior', 'Seated Side Bend'],
+    'restorative release': ['Supported Child\'s Pose', 'Legs Up the Wall', 'Supported Bridge',
+                            'Reclined Bound Angle', 'Supported Fish', 'Savasana'],
+}
+
+
+class ProgramService:
+    """Generate a multi-session program by fanning sessions out concurrently"""
+
+    def __init__(self, max_concurrency: int = 3, llm_service: Optional[LLMService] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        # The OpenAI client is thread-safe, so one service is shared by all sessions
+        self.llm_service = llm_service or LLMService()
+
+    def plan_sessions(self, spec: Dict) -> List[Dict]:
+        """Build one flow request per session with its intensity and focus"""
+        count = int(spec.get('sessions'))
+        progression = spec.get('progression', 'progressive')
+        focuses = spec.get('focuses') or DEFAULT_FOCUSES
+
+        # Sessions sharing a focus split its pool; every session avoids the other sessions' pools.
+        # Focuses without a pool of their own share the pools no session in this program uses.
+        session_focuses = [focuses[index % len(focuses)] for index in range(count)]
+        taken = {pose for focus in session_focuses for pose in FOCUS_POSE_POOLS.get(focus, [])}
+        all_poses = [pose for pool in FOCUS_POSE_POOLS.values() for pose in pool]
+        spare = [pose for pose in all_poses if pose not in taken] or all_poses
+        pools: List[List[str]] = []
+        for index, focus in enumerate(session_focuses):
+            if focus in FOCUS_POSE_POOLS:
+                siblings = [i for i, other in enumerate(session_focuses) if other == focus]
+                pool = FOCUS_POSE_POOLS[focus]
+            else:
+                siblings = [i for i, other in enumerate(session_focuses) if other not in FOCUS_POSE_POOLS]
+                pool = spare
+            pools.append(pool[siblings.index(index)::len(siblings)])
+
+        plans = []
+        for index in range(count):
+            if progression == 'progressive' and count > 1:
+                level = round(index * (len(INTENSITY_LEVELS) - 1) / (count - 1))
+            else:
+                level = 1
+            plans.append({
+                'routineName': f"{spec.get('routineName')} - Session {index + 1}",
+                'timeLength': spec.get('timeLength'),
+                'description': spec.get('description'),
+                'desiredPoses': spec.get('desiredPoses', ''),
+                'intensity': INTENSITY_LEVELS[level],
+                'focus': session_focuses[index],
+                'focusPoses': pools[index],
+                'avoidPoses': [pose for other, pool in enumerate(pools) if other != index
+                               for pose in pool if pose not in pools[index]],
+                'sessionNumber': index + 1,
+                'sessionCount': count,
+            })
+        return plans
+
+    def _generate_session(self, index: int, flow_request: Dict) -> Dict:
+        result = self.llm_service.generate_yoga_flow(flow_request)
+        if result.get('success'):
+            return {
+                'type': 'session',
+                'index': index,
+                'success': True,
+                'routine_name': flow_request['routineName'],
+                'intensity': flow_request['intensity'],
+                'focus': flow_request['focus'],
+                'duration': flow_request['timeLength'],
+                'flow_description': result['flow_description'],
+                'flow_sequence': result['flow_sequence'],
+                'validation': result.get('validation'),
+            }
+        return {
+            'type': 'session',
+            'index': index,
+            'success': False,
+            'routine_name': flow_request['routineName'],
+            'error': result.get('error', 'Unknown error'),
+        }
+
+    def generate_program(self, spec: Dict) -> Iterator[Dict]:
+        """Yield a header, then each session result as it completes, then a summary"""
+        plans = self.plan_sessions(spec)
+        yield {
+            'type': 'program',
+            'routine_name': spec.get('routineName'),
+            'sessions': len(plans),
+            'max_concurrency': self.max_concurrency,
+        }
+
+        succeeded = 0
+        executor = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(plans)))
+        try:
+            futures = {
+                executor.submit(self._generate_session, index, plan): index
+                for index, plan in enumerate(plans)
+            }
+            for future in as_completed(futures):
+                try:
+                    session = future.result()
+                except Exception as e:
+                    session = {
+                        'type': 'session',
+                        'index': futures[future],
+                        'success': False,
+                        'error': str(e),
+                    }
+                succeeded += 1 if session['success'] else 0
+                yield session
+        finally:
+            # Stop queued sessions if the client went away mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        yield {
+            'type': 'summary',
+            'succeeded': succeeded,
+            'failed': len(plans) - succeeded,
+        }
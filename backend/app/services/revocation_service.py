@@ -0,0 +1,363 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from ..utils.startup import register_after_fork
+
+DEFAULT_LOCAL_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', 'revoked_tokens.sqlite3'))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def _epoch(value: str) -> float:
+    """Seconds since the epoch for an ISO timestamp (naive timestamps are UTC)"""
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class LocalRevocationStore:
+    """SQLite-backed revoked-token store for single-host deployments and development"""
+
+    def __init__(self, path: str = DEFAULT_LOCAL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS revoked_tokens ('
+            ' jti TEXT PRIMARY KEY, user_id TEXT, expires_at TEXT NOT NULL, revoked_at TEXT NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS revoked_tokens_revoked_at ON revoked_tokens (revoked_at)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS user_revocations ('
+            ' user_id TEXT PRIMARY KEY, revoked_before TEXT NOT NULL, updated_at TEXT NOT NULL)'
+        )
+        self._conn.commit()
+
+    def revoke_token(self, jti: str, user_id: Optional[str], expires_at: str) -> bool:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO revoked_tokens VALUES (?, ?, ?, ?)',
+                (jti, user_id, expires_at, datetime.utcnow().isoformat())
+            )
+            self._conn.commit()
+        return True
+
+    def claim_token(self, jti: str, user_id: Optional[str], expires_at: str) -> Optional[bool]:
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO revoked_tokens VALUES (?, ?, ?, ?)',
+                (jti, user_id, expires_at, datetime.utcnow().isoformat())
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def is_token_revoked(self, jti: str) -> Optional[bool]:
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM revoked_tokens WHERE jti = ?', (jti,)).fetchone()
+        return row is not None
+
+    def get_revoked_tokens_since(self, since: str, limit: int = 1000) -> Optional[List[Dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT jti, revoked_at FROM revoked_tokens WHERE revoked_at >= ? AND expires_at > ?'
+                ' ORDER BY revoked_at LIMIT ?',
+                (since, datetime.utcnow().isoformat(), limit)
+            ).fetchall()
+        return [{'jti': jti, 'revoked_at': revoked_at} for jti, revoked_at in rows]
+
+    def revoke_user_tokens(self, user_id: str, revoked_before: str) -> bool:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO user_revocations VALUES (?, ?, ?)',
+                (user_id, revoked_before, datetime.utcnow().isoformat())
+            )
+            self._conn.commit()
+        return True
+
+    def get_user_revocation(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT revoked_before FROM user_revocations WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        return {'user_id': user_id, 'revoked_before': row[0]} if row else {}
+
+    def get_user_revocations_since(self, since: str, limit: int = 1000) -> Optional[List[Dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT user_id, revoked_before, updated_at FROM user_revocations WHERE updated_at >= ?'
+                ' ORDER BY updated_at LIMIT ?',
+                (since, limit)
+            ).fetchall()
+        return [{'user_id': user_id, 'revoked_before': revoked_before, 'updated_at': updated_at}
+                for user_id, revoked_before, updated_at in rows]
+
+
+class RevocationService:
+    """Per-worker revocation checks served from memory.
+
+    Every revoked ``jti`` and every per-user ``revoked_before`` cutoff lives
+    in the store (Supabase or local SQLite). A background thread mirrors them
+    into this worker's Bloom filter and cutoff map, pulling only rows changed
+    since its last refresh, so request threads never wait on the store for
+    a miss. A filter hit is confirmed against the store. Other workers see a
+    revocation within ``refresh_seconds``; the revoking worker sees it
+    immediately.
+
+    The checks fail closed. Until the first full load succeeds, every check
+    goes to the store, and a check the store cannot answer counts as revoked.
+    """
+
+    PAGE_SIZE = 1000
+    # Re-read a small window before the watermark to tolerate clock skew between writers
+    OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, store, capacity: int = 100000, error_rate: float = 0.001,
+                 refresh_seconds: float = 5.0, rebuild_seconds: float = 3600.0):
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        # Guards filter writes and the swap to a rebuilt filter
+        self._lock = threading.Lock()
+        self.filter = BloomFilter(capacity, error_rate)
+        self._watermark = datetime.min.isoformat()
+        self._user_cutoffs: Dict[str, float] = {}
+        self._user_watermark = datetime.min.isoformat()
+        self._loaded = False
+        self._last_rebuild = time.monotonic()
+        # jtis revoked by this worker while a rebuild is reading the store
+        self._pending: Optional[List[str]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def _since(self, watermark: str) -> str:
+        if watermark == datetime.min.isoformat():
+            return watermark
+        return (datetime.fromisoformat(watermark) - self.OVERLAP).isoformat()
+
+    def _fetch_since(self, fetch, since: str, stamp_field: str) -> Optional[Tuple[List[Dict], str]]:
+        """Page through rows stamped at or after ``since``; None if the store could not be read"""
+        collected: List[Dict] = []
+        watermark = since
+        while True:
+            try:
+                rows = fetch(since, self.PAGE_SIZE)
+            except Exception as e:
+                print(f"Error reading revocations: {e}")
+                rows = None
+            if rows is None:
+                return None
+            collected.extend(rows)
+            if rows:
+                previous, since = since, max(since, rows[-1][stamp_field])
+                watermark = max(watermark, since)
+            if len(rows) < self.PAGE_SIZE or since == previous:
+                return collected, watermark
+
+    @staticmethod
+    def _merge_cutoffs(cutoffs: Dict[str, float], rows: List[Dict]) -> None:
+        # Cutoffs only ever move forward, so merging by max is always safe
+        for row in rows:
+            cutoff = _epoch(row['revoked_before'])
+            if cutoff > cutoffs.get(row['user_id'], float('-inf')):
+                cutoffs[row['user_id']] = cutoff
+
+    def refresh(self) -> bool:
+        """Pull revocations recorded since the last refresh; False if the store could not be read"""
+        # Expired tokens never leave a Bloom filter, so rebuild periodically or when full
+        if (not self._loaded or time.monotonic() - self._last_rebuild > self.rebuild_seconds
+                or self.filter.count > self.filter.capacity):
+            return self.rebuild()
+
+        tokens = self._fetch_since(self.store.get_revoked_tokens_since, self._since(self._watermark), 'revoked_at')
+        users = self._fetch_since(self.store.get_user_revocations_since,
+                                  self._since(self._user_watermark), 'updated_at')
+        if tokens is None or users is None:
+            return False
+        with self._lock:
+            for row in tokens[0]:
+                self.filter.add(row['jti'])
+            self._watermark = max(self._watermark, tokens[1])
+            self._merge_cutoffs(self._user_cutoffs, users[0])
+            self._user_watermark = max(self._user_watermark, users[1])
+        return True
+
+    def rebuild(self) -> bool:
+        """Load every unexpired revocation into a fresh filter, then swap it in.
+
+        Checks keep using the old filter until the swap, so a rebuild never
+        opens a window in which revoked tokens are accepted.
+        """
+        with self._lock:
+            self._pending = []
+        capacity = max(self.capacity, self.filter.count * 2)
+        tokens = self._fetch_since(self.store.get_revoked_tokens_since, datetime.min.isoformat(), 'revoked_at')
+        users = self._fetch_since(self.store.get_user_revocations_since, datetime.min.isoformat(), 'updated_at')
+        if tokens is None or users is None:
+            with self._lock:
+                self._pending = None
+            return False
+
+        new_filter = BloomFilter(capacity, self.error_rate)
+        for row in tokens[0]:
+            new_filter.add(row['jti'])
+        with self._lock:
+            for jti in self._pending:
+                new_filter.add(jti)
+            self._pending = None
+            self._merge_cutoffs(self._user_cutoffs, users[0])
+            self.filter = new_filter
+            self._watermark = tokens[1]
+            self._user_watermark = users[1]
+            self._loaded = True
+        self.capacity = capacity
+        self._last_rebuild = time.monotonic()
+        return True
+
+    def _ensure_refreshing(self) -> None:
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='revocation-refresh', daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        failing = False
+        while True:
+            try:
+                ok = self.refresh()
+            except Exception as e:
+                print(f"Error refreshing revocations: {e}")
+                ok = False
+            if not ok and not failing:
+                print("⚠️  WARNING: Revocation store unreachable; revocation checks are failing closed")
+            failing = not ok
+            time.sleep(self.refresh_seconds)
+
+    def revoke(self, jti: str, user_id: Optional[str], expires_at: datetime) -> bool:
+        with self._lock:
+            self.filter.add(jti)
+            if self._pending is not None:
+                self._pending.append(jti)
+        return self.store.revoke_token(jti, user_id, expires_at.isoformat())
+
+    def claim(self, jti: str, user_id: Optional[str], expires_at: datetime) -> Optional[bool]:
+        """Revoke ``jti`` only if it is not revoked yet.
+
+        True if this call revoked it, False if it already was (the token was
+        used before), None if the store could not be written.
+        """
+        try:
+            claimed = self.store.claim_token(jti, user_id, expires_at.isoformat())
+        except Exception as e:
+            print(f"Error revoking token: {e}")
+            claimed = None
+        if claimed is not None:
+            with self._lock:
+                self.filter.add(jti)
+                if self._pending is not None:
+                    self._pending.append(jti)
+        return claimed
+
+    def revoke_user(self, user_id: str) -> bool:
+        """Revoke every token issued to ``user_id`` up to now"""
+        # Tokens carry a sub-second iat, so a token issued right after this call stays valid.
+        # Both values come from one datetime so the stored cutoff reads back exactly.
+        moment = datetime.now(timezone.utc)
+        cutoff = moment.timestamp()
+        with self._lock:
+            self._user_cutoffs[user_id] = max(cutoff, self._user_cutoffs.get(user_id, cutoff))
+        return self.store.revoke_user_tokens(user_id, moment.replace(tzinfo=None).isoformat())
+
+    def is_revoked(self, jti: str) -> bool:
+        self._ensure_refreshing()
+        if self._loaded and jti not in self.filter:
+            return False
+        # Possible hit (or not loaded yet): confirm against the store
+        try:
+            revoked = self.store.is_token_revoked(jti)
+        except Exception as e:
+            print(f"Error checking revoked token: {e}")
+            revoked = None
+        return True if revoked is None else revoked
+
+    def is_user_revoked(self, user_id: str, issued_at: float) -> bool:
+        """True if this token was issued at or before the user's revocation cutoff"""
+        self._ensure_refreshing()
+        if self._loaded:
+            cutoff = self._user_cutoffs.get(user_id)
+            return cutoff is not None and issued_at <= cutoff
+        try:
+            row = self.store.get_user_revocation(user_id)
+        except Exception as e:
+            print(f"Error checking user revocation: {e}")
+            row = None
+        if row is None:
+            return True
+        return bool(row) and issued_at <= _epoch(row['revoked_before'])
+
+
+_revocation_service: Optional[RevocationService] = None
+_service_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _revocation_service
+    _revocation_service = None
+
+
+register_after_fork(_reset_after_fork)
+
+
+def get_revocation_service() -> RevocationService:
+    """Return this worker's RevocationService, creating it on first use"""
+    global _revocation_service
+    if _revocation_service is None:
+        with _service_lock:
+            if _revocation_service is None:
+                backend = os.getenv('REVOCATION_STORE', 'supabase').lower()
+                if backend == 'supabase' and os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_ANON_KEY'):
+                    from .supabase_service import SupabaseService
+                    store = SupabaseService()
+                else:
+                    store = LocalRevocationStore(os.getenv('REVOCATION_LOCAL_PATH', DEFAULT_LOCAL_PATH))
+                _revocation_service = RevocationService(
+                    store,
+                    capacity=int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100000)),
+                    error_rate=float(os.getenv('REVOCATION_BLOOM_ERROR_RATE', 0.001)),
+                    refresh_seconds=float(os.getenv('REVOCATION_REFRESH_SECONDS', 5)),
+                )
+    return _revocation_service
@@ -0,0 +1,97 @@
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Sequence
+from ..models.flow import coerce_duration
+
+# Event kinds stored in SessionTimeline.event_kinds
+EVENT_POSE = 0
+EVENT_CUE = 1
+EVENT_COMPLETE = 2
+
+EVENT_NAMES = {
+    EVENT_POSE: 'pose',
+    EVENT_CUE: 'cue',
+    EVENT_COMPLETE: 'complete',
+}
+
+
+class SessionTimeline:
+    """Precomputed playback timeline for a flow_sequence.
+
+    Pose data and the event schedule are held in parallel arrays: ``starts``
+    holds the cumulative offset of each pose, and the ``event_*`` arrays hold
+    every event (pose start, transition cue, completion) sorted by offset.
+    A playing session only keeps an index into the event arrays. Offsets
+    and durations are signed 64-bit, so long flows cannot overflow them.
+    """
+
+    __slots__ = ('names', 'descriptions', 'durations', 'starts', 'total_seconds',
+                 'event_offsets', 'event_kinds', 'event_poses')
+
+    def __init__(self, flow_sequence: Sequence[Dict], cue_lead_seconds: int = 5):
+        self.names: List[str] = []
+        self.descriptions: List[str] = []
+        self.durations = array('q')
+        self.starts = array('q')
+
+        offset = 0
+        for step in flow_sequence:
+            if not isinstance(step, dict):
+                continue
+            duration = max(0, coerce_duration(step.get('duration', 0)))
+            if duration == 0:
+                continue
+            self.names.append(sys.intern(str(step.get('pose') or '')))
+            self.descriptions.append(step.get('description') or '')
+            self.durations.append(duration)
+            self.starts.append(offset)
+            offset += duration
+        self.total_seconds = offset
+
+        self.event_offsets = array('q')
+        self.event_kinds = array('B')
+        self.event_poses = array('I')
+        last = len(self.durations) - 1
+        for index, (start, duration) in enumerate(zip(self.starts, self.durations)):
+            self._add_event(start, EVENT_POSE, index)
+            # Announce the next pose shortly before the transition
+            if cue_lead_seconds > 0 and index < last and duration > cue_lead_seconds * 2:
+                self._add_event(start + duration - cue_lead_seconds, EVENT_CUE, index + 1)
+        self._add_event(self.total_seconds, EVENT_COMPLETE, max(last, 0))
+
+    def _add_event(self, offset: int, kind: int, pose_index: int) -> None:
+        self.event_offsets.append(offset)
+        self.event_kinds.append(kind)
+        self.event_poses.append(pose_index)
+
+    def __len__(self) -> int:
+        return len(self.durations)
+
+    def pose_index_at(self, elapsed: float) -> int:
+        """Index of the pose playing at ``elapsed`` seconds"""
+        return max(0, bisect_right(self.starts, elapsed) - 1)
+
+    def event_payload(self, event_index: int) -> Dict:
+        """Build the message sent to the client for one event"""
+        kind = self.event_kinds[event_index]
+        pose_index = self.event_poses[event_index]
+        payload = {
+            'type': EVENT_NAMES[kind],
+            'offset': self.event_offsets[event_index],
+        }
+        if kind == EVENT_POSE:
+            payload.update({
+                'index': pose_index,
+                'pose': self.names[pose_index],
+                'duration': self.durations[pose_index],
+                'description': self.descriptions[pose_index],
+            })
+        elif kind == EVENT_CUE:
+            lead = self.starts[pose_index] - self.event_offsets[event_index]
+            payload.update({
+                'index': pose_index,
+                'next_pose': self.names[pose_index],
+                'message': f"Transition to {self.names[pose_index]} in {lead} seconds",
+            })
+        return payload
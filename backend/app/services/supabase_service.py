@@ -1,7 +1,8 @@
-from supabase import create_client, Client
 import os
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, List
 from ..models.user import User
+from ..utils.startup import lazy_import
 
 class SupabaseService:
     """Service for interacting with Supabase database"""
@@ -14,7 +15,8 @@ class SupabaseService:
             print("⚠️  WARNING: Supabase URL and Key not set. Auth features will not work.")
             self.client = None
         else:
-            self.client: Client = create_client(self.supabase_url, self.supabase_key)
+            create_client = lazy_import('supabase').create_client
+            self.client = create_client(self.supabase_url, self.supabase_key)
     
     def create_user(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new user in the database"""
@@ -108,6 +110,247 @@ class SupabaseService:
                 'error': str(e)
             }
     
+    def create_flow(self, flow_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Save a generated flow in the flows table"""
+        if not self.client:
+            return {
+                'success': False,
+                'message': 'Supabase not configured',
+                'error': 'Database connection not available'
+            }
+        
+        try:
+            result = self.client.table('flows').insert(flow_data).execute()
+            
+            if result.data:
+                return {
+                    'success': True,
+                    'flow': result.data[0],
+                    'message': 'Flow saved successfully'
+                }
+            else:
+                return {
+                    'success': False,
+                    'message': 'Failed to save flow',
+                    'error': 'No data returned from insert'
+                }
+        except Exception as e:
+            return {
+                'success': False,
+                'message': 'Error saving flow',
+                'error': str(e)
+            }
+    
+    def get_flows_by_user(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all saved flows for a user, newest first"""
+        if not self.client:
+            return []
+        
+        try:
+            result = (self.client.table('flows').select('*')
+                      .eq('user_id', user_id)
+                      .order('created_at', desc=True)
+                      .execute())
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting flows for user: {e}")
+            return []
+    
+    def get_flows_for_index(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Get the searchable fields of all a user's saved flows; None if they could not be read"""
+        if not self.client:
+            return None
+        
+        try:
+            result = (self.client.table('flows')
+                      .select('id,routine_name,description,flow_sequence')
+                      .eq('user_id', user_id)
+                      .execute())
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting flows for search index: {e}")
+            return None
+    
+    def get_flow(self, user_id: str, flow_id: str) -> Optional[Dict[str, Any]]:
+        """Get one of a user's saved flows"""
+        if not self.client:
+            return None
+        
+        try:
+            result = self.client.table('flows').select('*').eq('id', flow_id).eq('user_id', user_id).execute()
+            
+            if result.data:
+                return result.data[0]
+            return None
+        except Exception as e:
+            print(f"Error getting flow: {e}")
+            return None
+    
+    def delete_flow(self, user_id: str, flow_id: str) -> bool:
+        """Delete one of a user's saved flows"""
+        if not self.client:
+            return False
+        
+        try:
+            result = self.client.table('flows').delete().eq('id', flow_id).eq('user_id', user_id).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error deleting flow: {e}")
+            return False
+    
+    # Token revocation uses the revoked_tokens table from migrations/001_token_revocation.sql
+    def revoke_token(self, jti: str, user_id: Optional[str], expires_at: str) -> bool:
+        """Record a revoked token id in the revoked_tokens table"""
+        if not self.client:
+            return False
+        
+        try:
+            self.client.table('revoked_tokens').upsert({
+                'jti': jti,
+                'user_id': user_id,
+                'expires_at': expires_at
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"Error revoking token: {e}")
+            return False
+    
+    def claim_token(self, jti: str, user_id: Optional[str], expires_at: str) -> Optional[bool]:
+        """Insert a revoked token id unless it is already there.
+        
+        True if it was inserted, False if it already existed, None on error.
+        """
+        if not self.client:
+            return None
+        
+        try:
+            result = self.client.table('revoked_tokens').upsert({
+                'jti': jti,
+                'user_id': user_id,
+                'expires_at': expires_at
+            }, on_conflict='jti', ignore_duplicates=True).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error revoking token: {e}")
+            return None
+    
+    def is_token_revoked(self, jti: str) -> Optional[bool]:
+        """Check whether a token id has been revoked; None if the check could not be made"""
+        if not self.client:
+            return None
+        
+        try:
+            result = self.client.table('revoked_tokens').select('jti').eq('jti', jti).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error checking revoked token: {e}")
+            return None
+    
+    def get_revoked_tokens_since(self, since: str, limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        """Get unexpired revoked token ids recorded at or after ``since`` (ISO timestamp), oldest first.
+        
+        Returns None if the table could not be read.
+        """
+        if not self.client:
+            return None
+        
+        try:
+            result = (self.client.table('revoked_tokens')
+                      .select('jti,revoked_at')
+                      .gte('revoked_at', since)
+                      .gt('expires_at', datetime.utcnow().isoformat())
+                      .order('revoked_at')
+                      .limit(limit)
+                      .execute())
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting revoked tokens: {e}")
+            return None
+    
+    # Revoking all of a user's tokens (logout everywhere, deactivation) uses the user_revocations
+    # table from the same migration. Tokens issued at or before revoked_before are rejected;
+    # updated_at must be set on every write.
+    def revoke_user_tokens(self, user_id: str, revoked_before: str) -> bool:
+        """Reject every token issued to a user before ``revoked_before`` (ISO timestamp, UTC)"""
+        if not self.client:
+            return False
+        
+        try:
+            self.client.table('user_revocations').upsert({
+                'user_id': user_id,
+                'revoked_before': revoked_before,
+                'updated_at': datetime.utcnow().isoformat()
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"Error revoking user tokens: {e}")
+            return False
+    
+    def get_user_revocation(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's revocation cutoff: the row, {} if there is none, or None if the check failed"""
+        if not self.client:
+            return None
+        
+        try:
+            result = (self.client.table('user_revocations')
+                      .select('user_id,revoked_before')
+                      .eq('user_id', user_id)
+                      .execute())
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            print(f"Error getting user revocation: {e}")
+            return None
+    
+    def get_user_revocations_since(self, since: str, limit: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        """Get user revocation cutoffs updated at or after ``since``, oldest first; None on error"""
+        if not self.client:
+            return None
+        
+        try:
+            result = (self.client.table('user_revocations')
+                      .select('user_id,revoked_before,updated_at')
+                      .gte('updated_at', since)
+                      .order('updated_at')
+                      .limit(limit)
+                      .execute())
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting user revocations: {e}")
+            return None
+
+    # LLM usage accounting uses an llm_usage table with one cumulative row per worker and day:
+    #   user_id text, day date, worker_id text, calls int, prompt_tokens int, completion_tokens int,
+    #   total_tokens int, updated_at timestamptz, primary key (user_id, day, worker_id)
+    def upsert_llm_usage(self, rows: List[Dict[str, Any]]) -> bool:
+        """Write a batch of cumulative per-worker usage rows in one request"""
+        if not self.client:
+            return False
+
+        try:
+            self.client.table('llm_usage').upsert(rows, on_conflict='user_id,day,worker_id').execute()
+            return True
+        except Exception as e:
+            print(f"Error writing LLM usage: {e}")
+            return False
+
+    def get_llm_usage(self, user_ids: List[str], day: str) -> Optional[List[Dict[str, Any]]]:
+        """Get every worker's usage rows for the given users on ``day`` (ISO date); None on error"""
+        if not self.client:
+            return None
+        if not user_ids:
+            return []
+
+        try:
+            result = (self.client.table('llm_usage')
+                      .select('user_id,worker_id,calls,prompt_tokens,completion_tokens,total_tokens')
+                      .in_('user_id', user_ids)
+                      .eq('day', day)
+                      .execute())
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting LLM usage: {e}")
+            return None
+
     def verify_password(self, password: str, stored_hash: str) -> bool:
         """Verify a password against its stored hash"""
         import hashlib
@@ -0,0 +1,295 @@
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..utils.startup import register_after_fork
+
+DEFAULT_LOCAL_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(__file__), '..', '..', 'data', 'llm_usage.sqlite3'))
+COUNTERS = ('calls', 'prompt_tokens', 'completion_tokens', 'total_tokens')
+ANONYMOUS_USER = 'anonymous'
+
+
+class LocalUsageStore:
+    """SQLite-backed usage store for single-host deployments and development"""
+
+    def __init__(self, path: str = DEFAULT_LOCAL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_usage ('
+            ' user_id TEXT NOT NULL, day TEXT NOT NULL, worker_id TEXT NOT NULL,'
+            ' calls INTEGER NOT NULL, prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL,'
+            ' total_tokens INTEGER NOT NULL, updated_at TEXT NOT NULL, PRIMARY KEY (user_id, day, worker_id))'
+        )
+        self._conn.commit()
+
+    def upsert_llm_usage(self, rows: List[Dict]) -> bool:
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO llm_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(row['user_id'], row['day'], row['worker_id'], row['calls'], row['prompt_tokens'],
+                  row['completion_tokens'], row['total_tokens'], row['updated_at']) for row in rows]
+            )
+            self._conn.commit()
+        return True
+
+    def get_llm_usage(self, user_ids: List[str], day: str) -> List[Dict]:
+        if not user_ids:
+            return []
+        placeholders = ','.join('?' * len(user_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT user_id, worker_id, {", ".join(COUNTERS)} FROM llm_usage'
+                f' WHERE day = ? AND user_id IN ({placeholders})',
+                (day, *user_ids)
+            ).fetchall()
+        return [dict(user_id=row[0], worker_id=row[1], **dict(zip(COUNTERS, row[2:]))) for row in rows]
+
+
+class UsageAccountant:
+    """Write-behind per-user LLM usage counters.
+
+    ``record`` only bumps in-memory counters for (user, UTC day). A background
+    thread upserts this worker's cumulative row for every changed key, in one
+    batch, every ``flush_seconds`` or as soon as ``flush_threshold`` keys are
+    dirty. Rows are cumulative, so a failed flush is simply retried and a
+    repeated upsert is harmless.
+
+    The first quota check for a user on this worker each day starts a
+    background read of every worker's rows for that user and waits at most
+    ``seed_wait_seconds`` for it; a slow store never holds a request longer
+    than that. After a failed read the store is left alone for a backoff
+    that doubles up to ``MAX_SEED_BACKOFF`` seconds, and checks answer from
+    this worker's own counters meanwhile. Once seeded, the flush thread
+    refreshes other workers' rows for the users this worker has seen, so
+    ``tokens_today`` answers from memory. Usage from other workers is
+    therefore up to ``flush_seconds`` stale.
+    """
+
+    MAX_SEED_BACKOFF = 60.0
+
+    def __init__(self, store, flush_seconds: float = 10.0, flush_threshold: int = 200,
+                 seed_wait_seconds: float = 0.25):
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.flush_threshold = flush_threshold
+        self.seed_wait_seconds = seed_wait_seconds
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{int(time.time())}'
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str], List[int]] = {}
+        self._dirty: set = set()
+        # usage by other workers per (user, day), refreshed by the flush thread
+        self._others: Dict[Tuple[str, str], List[int]] = {}
+        # (user, day) keys whose other-worker usage has been read from the store at least once
+        self._seeded: set = set()
+        # In-flight seed reads, and the backoff after a failed one
+        self._seeding: Dict[Tuple[str, str], threading.Event] = {}
+        self._seed_failures = 0
+        self._seed_retry_at = 0.0
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.utcnow().date().isoformat()
+
+    def record(self, user_id: Optional[str], usage: Dict[str, int]) -> None:
+        """Count one LLM call; never touches the network"""
+        key = (user_id or ANONYMOUS_USER, self._today())
+        with self._lock:
+            counters = self._counters.get(key)
+            if counters is None:
+                counters = self._counters[key] = [0, 0, 0, 0]
+            counters[0] += 1
+            counters[1] += usage.get('prompt_tokens', 0)
+            counters[2] += usage.get('completion_tokens', 0)
+            counters[3] += usage.get('total_tokens', 0)
+            self._dirty.add(key)
+            dirty_count = len(self._dirty)
+        if self._thread is None:
+            self._start()
+        if dirty_count >= self.flush_threshold:
+            self._wake.set()
+
+    def usage_today(self, user_id: str) -> Dict[str, int]:
+        """This user's usage today across all workers, as of the last refresh"""
+        key = (user_id, self._today())
+        with self._lock:
+            own = self._counters.get(key, [0, 0, 0, 0])
+            others = self._others.get(key, [0, 0, 0, 0])
+            return {name: own[i] + others[i] for i, name in enumerate(COUNTERS)}
+
+    def tokens_today(self, user_id: str) -> int:
+        """Tokens used today across all workers; never waits on the store longer than seed_wait_seconds"""
+        key = (user_id, self._today())
+        if key not in self._seeded:
+            seeding = self._request_seed(key)
+            if seeding is not None:
+                seeding.wait(self.seed_wait_seconds)
+        return self.usage_today(user_id)['total_tokens']
+
+    def _request_seed(self, key: Tuple[str, str]) -> Optional[threading.Event]:
+        """Start reading other workers' usage for ``key``; None while the store is backing off"""
+        with self._lock:
+            if key in self._seeded or time.monotonic() < self._seed_retry_at:
+                return None
+            seeding = self._seeding.get(key)
+            if seeding is None:
+                seeding = self._seeding[key] = threading.Event()
+                threading.Thread(target=self._seed, args=(key, seeding), name='usage-seed', daemon=True).start()
+        return seeding
+
+    def _seed(self, key: Tuple[str, str], seeding: threading.Event) -> None:
+        try:
+            rows = self.store.get_llm_usage([key[0]], key[1])
+        except Exception as e:
+            print(f"Error getting LLM usage: {e}")
+            rows = None
+        with self._lock:
+            if rows is None:
+                self._seed_failures += 1
+                backoff = min(self.MAX_SEED_BACKOFF, 2.0 ** (self._seed_failures - 1))
+                self._seed_retry_at = time.monotonic() + backoff
+            else:
+                self._seed_failures = 0
+                self._others[key] = self._sum_others(rows, key[1]).get(key, [0, 0, 0, 0])
+                self._seeded.add(key)
+            del self._seeding[key]
+        seeding.set()
+        # Keep the seeded value fresh even if this worker never serves the user's generations
+        if rows is not None and self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._stopping:
+                return
+            self._thread = threading.Thread(target=self._run, name='usage-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._stopping:
+                break
+            try:
+                self.flush()
+                self._refresh_others()
+            except Exception as e:
+                print(f"⚠️  WARNING: LLM usage flush failed: {e}")
+
+    def flush(self) -> bool:
+        """Upsert every changed counter row in one batch"""
+        now = datetime.utcnow().isoformat()
+        today = self._today()
+        with self._lock:
+            if not self._dirty:
+                return True
+            keys, self._dirty = self._dirty, set()
+            rows = [dict(user_id=user_id, day=day, worker_id=self.worker_id, updated_at=now,
+                         **dict(zip(COUNTERS, self._counters[(user_id, day)])))
+                    for user_id, day in keys]
+
+        try:
+            written = self.store.upsert_llm_usage(rows)
+        except Exception as e:
+            print(f"Error writing LLM usage: {e}")
+            written = False
+        if not written:
+            with self._lock:
+                self._dirty |= keys
+            return False
+
+        # Counters for past days are final once written
+        with self._lock:
+            for key in [key for key in self._counters if key[1] != today and key not in self._dirty]:
+                del self._counters[key]
+                self._others.pop(key, None)
+            self._seeded = {key for key in self._seeded if key[1] == today}
+        return True
+
+    def _sum_others(self, rows: List[Dict], day: str) -> Dict[Tuple[str, str], List[int]]:
+        others: Dict[Tuple[str, str], List[int]] = {}
+        for row in rows:
+            if row['worker_id'] != self.worker_id:
+                totals = others.setdefault((row['user_id'], day), [0, 0, 0, 0])
+                for i, name in enumerate(COUNTERS):
+                    totals[i] += row.get(name) or 0
+        return others
+
+    def _refresh_others(self) -> None:
+        today = self._today()
+        with self._lock:
+            user_ids = {user_id for user_id, day in self._counters if day == today and user_id != ANONYMOUS_USER}
+            user_ids |= {user_id for user_id, day in self._seeded if day == today}
+        if not user_ids:
+            return
+
+        rows = self.store.get_llm_usage(sorted(user_ids), today)
+        if rows is None:
+            return  # keep the last known values
+        others = self._sum_others(rows, today)
+        with self._lock:
+            self._others = others
+            self._seeded |= {(user_id, today) for user_id in user_ids}
+
+    def drain(self) -> None:
+        """Stop the flush thread and write out whatever is still pending"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_seconds)
+        if not self.flush():
+            print("⚠️  WARNING: LLM usage could not be written on shutdown")
+
+
+_accountant: Optional[UsageAccountant] = None
+_accountant_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # Each worker keeps its own counters and flush thread under its own worker id
+    global _accountant
+    _accountant = None
+
+
+register_after_fork(_reset_after_fork)
+
+
+def drain_usage() -> None:
+    """Flush this process's pending usage; called from gunicorn's worker_exit hook and at exit"""
+    accountant = _accountant
+    if accountant is not None and not accountant._stopping:
+        accountant.drain()
+
+
+atexit.register(drain_usage)
+
+
+def get_usage_accountant() -> UsageAccountant:
+    """Return this worker's UsageAccountant, creating it on first use"""
+    global _accountant
+    if _accountant is None:
+        with _accountant_lock:
+            if _accountant is None:
+                backend = os.getenv('USAGE_STORE', 'supabase').lower()
+                if backend == 'supabase' and os.getenv('SUPABASE_URL') and os.getenv('SUPABASE_ANON_KEY'):
+                    from .supabase_service import SupabaseService
+                    store = SupabaseService()
+                else:
+                    store = LocalUsageStore(os.getenv('USAGE_LOCAL_PATH', DEFAULT_LOCAL_PATH))
+                _accountant = UsageAccountant(
+                    store,
+                    flush_seconds=float(os.getenv('USAGE_FLUSH_SECONDS', 10)),
+                    flush_threshold=int(os.getenv('USAGE_FLUSH_THRESHOLD', 200)),
+                    seed_wait_seconds=float(os.getenv('USAGE_SEED_WAIT_SECONDS', 0.25)),
+                )
+    return _accountant
@@ -0,0 +1,65 @@
+from functools import wraps
+from flask import g, jsonify, request
+from ..services.jwt_service import JWTService
+
+
+def _bearer_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return None
+
+
+def _load_current_user() -> bool:
+    """Verify the bearer token (if any) and populate g.current_user / g.token_payload"""
+    g.current_user = None
+    g.token_payload = None
+    token = _bearer_token()
+    if not token:
+        return False
+
+    payload = JWTService().verify_token(token)
+    if not payload:
+        return False
+
+    g.token_payload = payload
+    g.current_user = {
+        'id': payload.get('user_id'),
+        'email': payload.get('email'),
+        'first_name': payload.get('first_name'),
+        'last_name': payload.get('last_name')
+    }
+    return True
+
+
+def token_required(view):
+    """Reject the request with 401 unless it carries a valid, unrevoked access token"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _load_current_user():
+            return jsonify({
+                'success': False,
+                'message': 'Authentication required',
+                'errors': ['A valid access token is required']
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def token_optional(view):
+    """Allow anonymous requests, but reject a bearer token that is present and invalid.
+
+    A bad token must not quietly downgrade to anonymous access, or a revoked
+    user could keep using the endpoint and any garbage token would skip
+    per-user quotas.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _load_current_user() and request.headers.get('Authorization'):
+            return jsonify({
+                'success': False,
+                'message': 'Authentication failed',
+                'errors': ['The access token is invalid, expired or revoked']
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
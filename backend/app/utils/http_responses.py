@@ -0,0 +1,67 @@
+import gzip
+import hashlib
+from flask import Flask, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'text/plain',
+    'text/html',
+}
+
+
+def _choose_encoding(min_size: int, size: int) -> str:
+    """Pick the best encoding the client accepts, or '' for identity"""
+    if size < min_size:
+        return ''
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered) or ''
+
+
+def _compress(data: bytes, encoding: str, app: Flask) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['BROTLI_QUALITY'])
+    # mtime=0 keeps the output deterministic for identical payloads
+    return gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL'], mtime=0)
+
+
+def init_http_responses(app: Flask) -> None:
+    """Register strong ETag / 304 handling and response compression"""
+
+    @app.after_request
+    def optimize_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers
+                or not 200 <= response.status_code < 300):
+            return response
+
+        data = response.get_data()
+        encoding = _choose_encoding(app.config['COMPRESS_MIN_SIZE'], len(data))
+        if encoding:
+            response.vary.add('Accept-Encoding')
+
+        # Strong ETags for successful reads; each encoding is its own representation
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+            etag = f'{digest}-{encoding}' if encoding else digest
+            response.set_etag(etag)
+            if 'Cache-Control' not in response.headers:
+                response.headers['Cache-Control'] = 'private, no-cache'
+            if request.if_none_match.contains(etag):
+                # Reuse the response so headers from other hooks (e.g. CORS) are kept
+                response.status_code = 304
+                response.set_data(b'')
+                for header in ('Content-Type', 'Content-Length'):
+                    response.headers.pop(header, None)
+                return response
+
+        if encoding:
+            response.set_data(_compress(data, encoding, app))
+            response.headers['Content-Encoding'] = encoding
+        return response
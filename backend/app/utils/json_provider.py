@@ -0,0 +1,47 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, falling back to Flask's stdlib provider.
+
+    Datetimes are passed through to Flask's ``default`` so they keep the
+    same RFC 822 format as ``jsonify`` did before.
+    """
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent: bool = False) -> bytes:
+        """Serialize straight to UTF-8 bytes (avoids a decode/encode round trip)"""
+        if orjson is None:
+            kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+            return self.dumps(obj, **kwargs).encode()
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Callers passing json.dumps-specific arguments get the stdlib encoder
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
@@ -0,0 +1,158 @@
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+# Third-party SDKs that dominate worker import time. They are only needed once
+# a request actually talks to OpenAI / Supabase / signs a token, or validates a
+# large batch with numpy, so services import them through ``lazy_import``
+# instead of at module import time.
+HEAVY_MODULES = [
+    'openai',
+    'supabase',
+    'jwt',
+    'numpy',
+]
+
+_import_times: Dict[str, float] = {}
+_boot_import_times: Dict[str, float] = {}
+_boot_total = 0.0
+_log_lazy_imports = False
+_after_fork_callbacks: List[Callable[[], None]] = []
+
+
+class _TopLevelImportTimer(importlib.abc.MetaPathFinder):
+    """Times the first import of each top-level package (including its own imports).
+
+    The spec's own loader is kept, so ``module.__loader__`` and everything
+    that relies on it (``importlib.resources``, ``inspect``, ``pkgutil``)
+    behave as usual. Only that loader instance's ``exec_module`` is shadowed
+    for the duration of the import.
+    """
+
+    def __init__(self, times: Dict[str, float]):
+        self.times = times
+        self._resolving = set()
+
+    def find_spec(self, fullname, path, target=None):
+        if '.' in fullname or fullname in self._resolving:
+            return None
+        self._resolving.add(fullname)
+        try:
+            spec = importlib.util.find_spec(fullname)
+        finally:
+            self._resolving.discard(fullname)
+        loader = getattr(spec, 'loader', None) if spec else None
+        # Built-in and frozen importers are shared classes, not per-module instances; leave them alone
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return None
+
+        times = self.times
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                times.setdefault(fullname, time.perf_counter() - start)
+                loader.__dict__.pop('exec_module', None)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass  # loader without an instance dict; import it untimed
+        return spec
+
+
+def lazy_import(module_name: str):
+    """Import a module on first use and record how long the import took"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    if module_name not in _import_times:
+        _import_times[module_name] = elapsed
+        if _log_lazy_imports:
+            print(f"📦 Imported {module_name} on first use in {elapsed * 1000:.1f} ms (pid {os.getpid()})")
+    return module
+
+
+@contextmanager
+def track_boot_imports() -> Iterator[None]:
+    """Record how long each top-level package imported inside the block took"""
+    global _boot_total
+    timer = _TopLevelImportTimer(_boot_import_times)
+    sys.meta_path.insert(0, timer)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _boot_total += time.perf_counter() - start
+        sys.meta_path.remove(timer)
+
+
+def log_lazy_imports(enabled: bool = True) -> None:
+    """Print each heavy module's import time when it is first imported on demand"""
+    global _log_lazy_imports
+    _log_lazy_imports = enabled
+
+
+def preload_heavy_modules() -> None:
+    """Import every heavy SDK up front (used by the gunicorn master with preload_app)"""
+    for module_name in HEAVY_MODULES:
+        try:
+            lazy_import(module_name)
+        except ImportError as e:
+            print(f"⚠️  WARNING: Could not preload {module_name}: {e}")
+
+
+def get_import_times() -> Dict[str, float]:
+    """Return recorded import durations in seconds, slowest first"""
+    return dict(sorted(_import_times.items(), key=lambda item: item[1], reverse=True))
+
+
+def get_boot_import_times() -> Dict[str, float]:
+    """Return boot-time import durations per top-level package in seconds, slowest first"""
+    return dict(sorted(_boot_import_times.items(), key=lambda item: item[1], reverse=True))
+
+
+def report_import_times() -> None:
+    """Print the boot-time and heavy-module import times recorded so far"""
+    boot_times = get_boot_import_times()
+    if boot_times:
+        # Times are cumulative: a package includes whatever it imported first
+        print(f"📦 Boot import times (pid {os.getpid()}, {_boot_total * 1000:.1f} ms importing the app):")
+        for module_name, seconds in list(boot_times.items())[:10]:
+            print(f"   - {module_name}: {seconds * 1000:.1f} ms")
+
+    times = get_import_times()
+    if not times:
+        print("📦 Heavy modules not imported yet (lazy startup); first-use imports will be logged")
+        return
+
+    print(f"📦 Heavy module import times (pid {os.getpid()}):")
+    for module_name, seconds in times.items():
+        print(f"   - {module_name}: {seconds * 1000:.1f} ms")
+    print(f"   total: {sum(times.values()) * 1000:.1f} ms")
+
+
+def register_after_fork(callback: Callable[[], None]) -> None:
+    """Register a callback that resets fork-unsafe state in a freshly forked worker"""
+    _after_fork_callbacks.append(callback)
+
+
+def run_after_fork() -> None:
+    """Run all registered after-fork callbacks (called from gunicorn's post_fork hook)"""
+    for callback in _after_fork_callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"⚠️  WARNING: after-fork callback {callback!r} failed: {e}")
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Compile data/poses_database.json into the memory-mapped binary pose catalog
+"""
+
+import sys
+from app.services.pose_catalog import DEFAULT_BINARY_PATH, DEFAULT_JSON_PATH, build_pose_catalog
+
+if __name__ == '__main__':
+    json_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_JSON_PATH
+    binary_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_BINARY_PATH
+    count = build_pose_catalog(json_path, binary_path)
+    print(f"✅ Compiled {count} poses into {binary_path}")
@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for YogaFlow
+
+Loaded automatically by gunicorn from the working directory. With preload_app
+enabled the master imports the app (and, via STARTUP_MODE=preload, the heavy
+SDKs) once, and forked workers share those pages copy-on-write.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+if preload_app:
+    os.environ.setdefault('STARTUP_MODE', 'preload')
+
+
+def post_fork(server, worker):
+    """Reset fork-unsafe state (clients, sockets, background threads) in each worker"""
+    from app.utils.startup import run_after_fork
+    run_after_fork()
+
+
+def worker_exit(server, worker):
+    """Write out buffered LLM usage counters before the worker goes away"""
+    from app.services.usage_service import drain_usage
+    drain_usage()
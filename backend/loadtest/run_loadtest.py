@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+YogaFlow load-testing harness
+
+Starts local OpenAI/Supabase stand-ins, boots wsgi:app under gunicorn for
+every requested (worker class, worker count) combination, and ramps a
+closed-loop client through increasing concurrency levels with a weighted
+mix of /api/flow/generate, /api/auth/login and /api/auth/signup.
+
+Run from the backend directory:
+    python -m loadtest.run_loadtest --worker-classes sync,gthread --workers 2,4
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from .stub_servers import OpenAIStubHandler, StubConfig, SupabaseStubHandler, start_stub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Any three dot-separated segments pass supabase-py's key handling
+STUB_SUPABASE_KEY = 'stub.stub.stub'
+LOGIN_PASSWORD = 'loadtest-password'
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class AppClient:
+    """Keep-alive HTTP client for one load-generating thread"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def post(self, path: str, payload: Dict) -> int:
+        body = json.dumps(payload)
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+                response = self.conn.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        return 0
+
+
+class LoadRunner:
+    """Closed-loop load generator: each thread issues its next request when the previous one finishes"""
+
+    def __init__(self, host: str, port: int, mix: Dict[str, float], users: List[str],
+                 flow_minutes: int, timeout: float):
+        self.host, self.port = host, port
+        self.mix = mix
+        self.users = users
+        self.flow_minutes = flow_minutes
+        self.timeout = timeout
+
+    def _request(self, client: AppClient, kind: str) -> int:
+        if kind == 'generate':
+            return client.post('/api/flow/generate', {
+                'routineName': 'Load test flow',
+                'timeLength': str(self.flow_minutes),
+                'description': 'Hip opening flow with pigeon',
+            })
+        if kind == 'login':
+            return client.post('/api/auth/login', {'email': random.choice(self.users), 'password': LOGIN_PASSWORD})
+        return client.post('/api/auth/signup', {
+            'email': f'load-{uuid.uuid4().hex}@example.com',
+            'password': LOGIN_PASSWORD,
+            'firstName': 'Load',
+            'lastName': 'Test',
+        })
+
+    def run_level(self, concurrency: int, seconds: float) -> Dict:
+        results: List[Tuple[str, float, int]] = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        kinds, weights = zip(*self.mix.items())
+
+        def worker():
+            client = AppClient(self.host, self.port, self.timeout)
+            local = []
+            while time.perf_counter() < deadline:
+                kind = random.choices(kinds, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = self._request(client, kind)
+                except Exception:
+                    status = 0
+                local.append((kind, time.perf_counter() - start, status))
+            with lock:
+                results.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return summarize(concurrency, elapsed, results)
+
+
+def summarize(concurrency: int, elapsed: float, results: List[Tuple[str, float, int]]) -> Dict:
+    latencies = sorted(latency for _, latency, _ in results)
+    errors = sum(1 for _, _, status in results if status == 0 or status >= 500)
+    per_endpoint = {}
+    for kind in sorted({kind for kind, _, _ in results}):
+        values = sorted(latency for k, latency, _ in results if k == kind)
+        per_endpoint[kind] = {
+            'requests': len(values),
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+        }
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'endpoints': per_endpoint,
+    }
+
+
+def find_collapse(levels: List[Dict], latency_factor: float, max_error_rate: float) -> Optional[int]:
+    """First concurrency whose p90 exceeds latency_factor x the lowest level's p90, or that errors too much"""
+    if not levels:
+        return None
+    baseline = max(levels[0]['p90_ms'], 1.0)
+    for level in levels:
+        if level['p90_ms'] > baseline * latency_factor or level['error_rate'] > max_error_rate:
+            return level['concurrency']
+    return None
+
+
+def start_gunicorn(worker_class: str, workers: int, threads: int, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    command = [
+        sys.executable, '-m', 'gunicorn', 'wsgi:app',
+        '--config', 'gunicorn.conf.py',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--worker-class', worker_class,
+        '--threads', str(threads),
+        '--log-level', 'warning',
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/flow/test')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'gunicorn did not become ready on port {port}')
+
+
+def seed_users(port: int, count: int) -> List[str]:
+    client = AppClient('127.0.0.1', port, 30)
+    emails = []
+    for index in range(count):
+        email = f'seed-{index}-{uuid.uuid4().hex[:8]}@example.com'
+        status = client.post('/api/auth/signup', {
+            'email': email, 'password': LOGIN_PASSWORD, 'firstName': 'Seed', 'lastName': 'User',
+        })
+        if status == 201:
+            emails.append(email)
+    if not emails:
+        raise RuntimeError('could not seed any users; check the Supabase stub error rate')
+    return emails
+
+
+def print_table(title: str, levels: List[Dict], collapse: Optional[int]) -> None:
+    print(f"\n=== {title} ===")
+    print(f"{'conc':>5} {'req':>7} {'rps':>8} {'err%':>6} {'p50ms':>8} {'p90ms':>8} {'p99ms':>8}")
+    for level in levels:
+        print(f"{level['concurrency']:>5} {level['requests']:>7} {level['throughput_rps']:>8} "
+              f"{level['error_rate'] * 100:>6.1f} {level['p50_ms']:>8} {level['p90_ms']:>8} {level['p99_ms']:>8}")
+    peak = max(levels, key=lambda level: level['throughput_rps']) if levels else None
+    if peak:
+        print(f"peak throughput: {peak['throughput_rps']} rps at concurrency {peak['concurrency']}")
+    print(f"latency collapse: {'concurrency ' + str(collapse) if collapse else 'not reached'}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-classes', default='sync', help='comma-separated gunicorn worker classes')
+    parser.add_argument('--workers', default='2', help='comma-separated worker counts')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker (gthread only)')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32,64', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per concurrency level')
+    parser.add_argument('--mix', default='generate=6,login=3,signup=1', help='endpoint weights')
+    parser.add_argument('--flow-minutes', type=int, default=30)
+    parser.add_argument('--openai-latency', type=float, default=2.0, help='mean stand-in OpenAI latency (s)')
+    parser.add_argument('--openai-jitter', type=float, default=0.5)
+    parser.add_argument('--openai-error-rate', type=float, default=0.0)
+    parser.add_argument('--supabase-latency', type=float, default=0.05)
+    parser.add_argument('--supabase-jitter', type=float, default=0.02)
+    parser.add_argument('--supabase-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed-users', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=130.0, help='client request timeout (s)')
+    parser.add_argument('--collapse-factor', type=float, default=3.0)
+    parser.add_argument('--max-error-rate', type=float, default=0.05)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--json', dest='json_path', help='write full results to this file')
+    args = parser.parse_args(argv)
+
+    openai_stub = start_stub(OpenAIStubHandler, StubConfig(
+        args.openai_latency, args.openai_jitter, args.openai_error_rate))
+    supabase_stub = start_stub(SupabaseStubHandler, StubConfig(
+        args.supabase_latency, args.supabase_jitter, args.supabase_error_rate))
+
+    env = {
+        **os.environ,
+        'FLASK_ENV': 'production',
+        'OPENAI_API_KEY': 'stub-key',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{openai_stub.server_address[1]}/v1',
+        'SUPABASE_URL': f'http://127.0.0.1:{supabase_stub.server_address[1]}',
+        'SUPABASE_ANON_KEY': STUB_SUPABASE_KEY,
+        'REPORT_IMPORT_TIMES': 'False',
+    }
+    mix = parse_mix(args.mix)
+    levels = [int(c) for c in args.concurrency.split(',')]
+    report = []
+
+    for worker_class in args.worker_classes.split(','):
+        for workers in [int(w) for w in args.workers.split(',')]:
+            threads = args.threads if worker_class == 'gthread' else 1
+            title = f'{worker_class} x{workers} workers' + (f' x{threads} threads' if threads > 1 else '')
+            process = start_gunicorn(worker_class, workers, threads, args.port, env)
+            try:
+                wait_until_ready(args.port)
+                users = seed_users(args.port, args.seed_users)
+                runner = LoadRunner('127.0.0.1', args.port, mix, users, args.flow_minutes, args.timeout)
+                results = []
+                for concurrency in levels:
+                    results.append(runner.run_level(concurrency, args.duration))
+                    print(f"  {title}: concurrency {concurrency} -> {results[-1]['throughput_rps']} rps, "
+                          f"p90 {results[-1]['p90_ms']} ms", flush=True)
+                collapse = find_collapse(results, args.collapse_factor, args.max_error_rate)
+                print_table(title, results, collapse)
+                report.append({
+                    'worker_class': worker_class,
+                    'workers': workers,
+                    'threads': threads,
+                    'levels': results,
+                    'collapse_concurrency': collapse,
+                })
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    openai_stub.shutdown()
+    supabase_stub.shutdown()
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote results to {args.json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Local stand-ins for the OpenAI and Supabase HTTP APIs used by the load test
+
+Both servers add configurable latency and fail a configurable fraction of
+requests with HTTP 500 so gunicorn worker settings can be compared under
+realistic upstream behaviour without touching the real services.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+POSES = [
+    'Mountain Pose', 'Downward Facing Dog', 'Warrior I', 'Warrior II', 'Triangle Pose',
+    'Extended Side Angle', 'Chair Pose', 'Low Lunge', 'Pigeon Pose', 'Bridge Pose',
+    'Cobra Pose', 'Cat-Cow', "Child's Pose", 'Tree Pose', 'Half Moon', 'Seated Forward Fold',
+]
+CUE = 'Stack the joints, press evenly through both feet and lengthen the spine as you breathe.'
+
+
+class StubConfig:
+    """Latency (mean/jitter in seconds) and error rate for one stub server"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    def delay(self) -> None:
+        seconds = self.latency + random.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def _poses_for(seconds: int, pose_seconds: int = 60) -> List[Dict]:
+    count = max(1, seconds // pose_seconds)
+    return [{'pose': random.choice(POSES), 'duration': pose_seconds, 'description': CUE}
+            for _ in range(count)]
+
+
+def fake_completion(prompt: str) -> str:
+    """Produce a flow (or top-up array) whose durations match what the prompt asks for"""
+    topup = re.search(r'as close as possible to (\d+) seconds', prompt)
+    if topup:
+        return json.dumps(_poses_for(min(int(topup.group(1)), 240)))
+
+    total = re.search(r'approximately (\d+) seconds', prompt)
+    target = int(total.group(1)) if total else 1800
+    warm, cool = 300, 300
+    return (
+        "**FLOW_DESCRIPTION:**\nA balanced stand-in flow for load testing.\n\n"
+        f"**WARMUP_SEQUENCE:**\n{json.dumps(_poses_for(warm))}\n\n"
+        f"**MAIN_SEQUENCE:**\n{json.dumps(_poses_for(max(60, target - warm - cool)))}\n\n"
+        f"**COOLDOWN_SEQUENCE:**\n{json.dumps(_poses_for(cool))}\n"
+    )
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config: StubConfig = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return json.loads(body) if body else None
+
+    def _send(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _fail_if_configured(self) -> bool:
+        self.config.delay()
+        if self.config.should_fail():
+            self._send(500, {'error': {'message': 'stub injected failure'}})
+            return True
+        return False
+
+
+class OpenAIStubHandler(_JSONHandler):
+    """Implements POST /v1/chat/completions"""
+
+    def do_POST(self):
+        data = self._read_json() or {}
+        if self._fail_if_configured():
+            return
+        prompt = (data.get('messages') or [{}])[-1].get('content', '')
+        content = fake_completion(prompt)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self._send(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': data.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+
+class SupabaseStubHandler(_JSONHandler):
+    """Implements the PostgREST subset used by SupabaseService (users table)"""
+
+    users: Dict[str, Dict] = {}
+    lock = threading.Lock()
+
+    def _filters(self) -> Tuple[str, Dict[str, str]]:
+        parsed = urlparse(self.path)
+        filters = {}
+        for key, values in parse_qs(parsed.query).items():
+            if key != 'select' and values[0].startswith('eq.'):
+                filters[key] = values[0][3:]
+        return parsed.path, filters
+
+    def do_GET(self):
+        path, filters = self._filters()
+        if self._fail_if_configured():
+            return
+        if not path.endswith('/users'):
+            self._send(200, [])
+            return
+        with self.lock:
+            rows = [row for row in self.users.values()
+                    if all(str(row.get(k)) == v for k, v in filters.items())]
+        self._send(200, rows)
+
+    def do_POST(self):
+        path, _ = self._filters()
+        data = self._read_json()
+        if self._fail_if_configured():
+            return
+        rows = data if isinstance(data, list) else [data or {}]
+        created = []
+        with self.lock:
+            for row in rows:
+                row = {**row, 'id': row.get('id') or str(uuid.uuid4())}
+                if path.endswith('/users'):
+                    self.users[row['id']] = row
+                created.append(row)
+        self._send(201, created)
+
+    def do_PATCH(self):
+        path, filters = self._filters()
+        data = self._read_json() or {}
+        if self._fail_if_configured():
+            return
+        with self.lock:
+            rows = [row for row in self.users.values()
+                    if all(str(row.get(k)) == v for k, v in filters.items())]
+            for row in rows:
+                row.update(data)
+        self._send(200, rows)
+
+
+def start_stub(handler_cls, config: StubConfig, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """Start a stub server on a background thread; port 0 picks a free port"""
+    handler = type(handler_cls.__name__, (handler_cls,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
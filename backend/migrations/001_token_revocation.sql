@@ -0,0 +1,21 @@
+-- Token revocation tables read by RevocationService (app/services/revocation_service.py).
+-- Revocation checks fail closed, so apply this before deploying: without these tables
+-- every authenticated request is rejected.
+
+-- One row per revoked token id (logout, refresh-token rotation); rows can be pruned after expires_at
+create table if not exists revoked_tokens (
+    jti text primary key,
+    user_id text,
+    expires_at timestamptz not null,
+    revoked_at timestamptz not null default now()
+);
+create index if not exists revoked_tokens_revoked_at on revoked_tokens (revoked_at);
+
+-- Per-user cutoff (logout everywhere, deactivation): tokens issued at or before revoked_before
+-- are rejected. updated_at is set by the app on every write and drives incremental refreshes.
+create table if not exists user_revocations (
+    user_id text primary key,
+    revoked_before timestamptz not null,
+    updated_at timestamptz not null default now()
+);
+create index if not exists user_revocations_updated_at on user_revocations (updated_at);
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Session playback WebSocket server
+
+Clients authenticate with the same JWT access token as the HTTP API, sent
+in the handshake as "Authorization: Bearer <token>" or, for browsers that
+cannot set headers on a WebSocket, as a "?token=<token>" query parameter.
+
+Clients send JSON messages:
+    {"action": "start", "flow_sequence": [...]}
+    {"action": "pause"} / {"action": "resume"} / {"action": "stop"}
+and receive "pose", "cue", "paused", "resumed" and "complete" events pushed
+at the right time by a single PlaybackScheduler shared by all connections.
+"""
+
+import asyncio
+import json
+import os
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from app.models.flow import coerce_duration
+from app.services.jwt_service import JWTService
+from app.services.playback_service import PlaybackScheduler
+from app.services.session_timeline import SessionTimeline
+
+CUE_LEAD_SECONDS = int(os.getenv('PLAYBACK_CUE_LEAD_SECONDS', 5))
+MAX_POSES = int(os.getenv('PLAYBACK_MAX_POSES', 500))
+MAX_POSE_SECONDS = int(os.getenv('PLAYBACK_MAX_POSE_SECONDS', 3600))
+
+scheduler: PlaybackScheduler = None
+
+
+def request_token(request) -> str:
+    """The bearer token from the handshake headers or the ?token= query parameter"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[len('Bearer '):].strip()
+    return (parse_qs(urlsplit(request.path).query).get('token') or [''])[0]
+
+
+async def authenticate(connection, request):
+    """Reject the handshake with 401 unless it carries a valid, unrevoked access token"""
+    token = request_token(request)
+    # verify_token may consult the revocation store, so keep it off the event loop
+    payload = await asyncio.to_thread(JWTService().verify_token, token) if token else None
+    if not payload:
+        return connection.respond(HTTPStatus.UNAUTHORIZED, 'A valid access token is required\n')
+    connection.user_id = payload.get('user_id')
+    return None
+
+
+def sequence_error(sequence) -> str:
+    """Why a flow_sequence cannot be played, or '' if it can"""
+    if not isinstance(sequence, list) or not sequence:
+        return 'flow_sequence is required'
+    if len(sequence) > MAX_POSES:
+        return f'flow_sequence may have at most {MAX_POSES} poses'
+    for index, step in enumerate(sequence):
+        if not isinstance(step, dict):
+            return f'Pose {index} must be an object'
+        duration = coerce_duration(step.get('duration', 0))
+        if duration < 0 or duration > MAX_POSE_SECONDS:
+            return f'Pose {index} duration must be between 0 and {MAX_POSE_SECONDS} seconds'
+    return ''
+
+
+async def pump_events(websocket, session):
+    """Forward queued session events to the client"""
+    while True:
+        event = await session.queue.get()
+        await websocket.send(json.dumps(event))
+        if event['type'] == 'complete':
+            return
+
+
+async def handle_connection(websocket):
+    """One WebSocket connection drives at most one live session"""
+    session = None
+    sender = None
+    try:
+        async for message in websocket:
+            try:
+                data = json.loads(message)
+            except ValueError:
+                await websocket.send(json.dumps({'type': 'error', 'message': 'Invalid JSON'}))
+                continue
+            if not isinstance(data, dict):
+                await websocket.send(json.dumps({'type': 'error', 'message': 'Messages must be JSON objects'}))
+                continue
+            action = data.get('action')
+
+            if action == 'start':
+                sequence = data.get('flow_sequence') or []
+                error = sequence_error(sequence)
+                if not error:
+                    try:
+                        timeline = SessionTimeline(sequence, cue_lead_seconds=CUE_LEAD_SECONDS)
+                    except (TypeError, ValueError, OverflowError) as e:
+                        error = f'Invalid flow_sequence: {e}'
+                if error:
+                    await websocket.send(json.dumps({'type': 'error', 'message': error}))
+                    continue
+                if session is not None:
+                    scheduler.stop(session)
+                    sender.cancel()
+                session = scheduler.start(timeline)
+                await websocket.send(json.dumps({
+                    'type': 'started',
+                    'session_id': session.id,
+                    'poses': len(timeline),
+                    'total_seconds': timeline.total_seconds,
+                }))
+                sender = asyncio.create_task(pump_events(websocket, session))
+            elif session is None:
+                await websocket.send(json.dumps({'type': 'error', 'message': 'No session started'}))
+            elif action == 'pause':
+                scheduler.pause(session)
+            elif action == 'resume':
+                scheduler.resume(session)
+            elif action == 'stop':
+                scheduler.stop(session)
+                sender.cancel()
+                await websocket.send(json.dumps({'type': 'stopped', 'session_id': session.id}))
+                session = None
+            else:
+                await websocket.send(json.dumps({'type': 'error', 'message': f'Unknown action: {action}'}))
+    except ConnectionClosed:
+        pass
+    finally:
+        if session is not None:
+            scheduler.stop(session)
+        if sender is not None:
+            sender.cancel()
+
+
+async def main():
+    global scheduler
+    scheduler = PlaybackScheduler(asyncio.get_running_loop())
+
+    host = os.getenv('PLAYBACK_HOST', '0.0.0.0')
+    port = int(os.getenv('PLAYBACK_PORT', os.getenv('PORT', 8765)))
+    print(f"⏱️  Starting YogaFlow playback server on ws://{host}:{port}")
+    async with serve(handle_connection, host, port, process_request=authenticate) as server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from app.services.flow_search import FlowSearchIndex
+
+
+def make_flow(flow_id, name, pose='Warrior II'):
+    return {'id': flow_id, 'routine_name': name, 'description': '',
+            'flow_sequence': [{'pose': pose, 'duration': 60, 'description': ''}]}
+
+
+class Source:
+    def __init__(self, flows):
+        self.flows = flows
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, user_id):
+        self.calls += 1
+        self.release.wait(5)
+        return list(self.flows)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_first_search_builds_missing_index(tmp_path):
+    source = Source([make_flow('a', 'Morning Hips')])
+    index = FlowSearchIndex(str(tmp_path / 'search.sqlite3'), source)
+
+    assert [r['id'] for r in index.search('u1', 'hips')] == ['a']
+    assert source.calls == 1
+    index.search('u1', 'hips')
+    assert source.calls == 1
+
+
+def test_stale_index_is_served_while_resync_runs_in_background(tmp_path):
+    source = Source([make_flow('a', 'Morning Hips')])
+    index = FlowSearchIndex(str(tmp_path / 'search.sqlite3'), source, resync_seconds=0.01)
+    index.search('u1', 'hips')
+
+    source.flows.append(make_flow('b', 'Evening Hips'))
+    source.release.clear()
+    time.sleep(0.02)
+    # The resync is blocked on the source, yet the search answers from the persisted index
+    assert [r['id'] for r in index.search('u1', 'hips')] == ['a']
+
+    source.release.set()
+    assert wait_until(lambda: len(index.search('u1', 'hips')) == 2)
+
+
+def test_resync_is_discarded_when_index_changes_during_read(tmp_path):
+    source = Source([make_flow('a', 'Morning Hips')])
+    index = FlowSearchIndex(str(tmp_path / 'search.sqlite3'), source)
+    index.search('u1', 'hips')
+
+    source.release.clear()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(index.sync_user('u1')))
+    worker.start()
+    assert wait_until(lambda: source.calls == 2)
+    # Saved while the source was being read; the stale rebuild must not drop it
+    index.add_flow('u1', make_flow('b', 'Evening Hips'))
+    source.release.set()
+    worker.join(5)
+
+    assert results == [False]
+    assert {r['id'] for r in index.search('u1', 'hips')} == {'a', 'b'}
+
+
+def test_workers_reload_after_version_bump(tmp_path):
+    path = str(tmp_path / 'search.sqlite3')
+    first, second = FlowSearchIndex(path), FlowSearchIndex(path)
+    first.add_flow('u1', make_flow('a', 'Morning Hips'))
+    assert [r['id'] for r in second.search('u1', 'hips')] == ['a']
+
+    first.remove_flow('u1', 'a')
+    assert second.search('u1', 'hips') == []
@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from app.models.flow import Flow
+from app.services import flow_validator
+from app.services.flow_validator import FlowBatch, FlowValidator, ValidationRules
+
+POSES = ['Mountain', 'Warrior II', 'Tree', 'Boat', 'Pigeon', 'Savasana', 'Crow']
+
+
+def random_flows(count, seed=7):
+    rng = random.Random(seed)
+    flows = []
+    for i in range(count):
+        if i % 3 == 0:
+            flow = {segment: [random_step(rng) for _ in range(rng.randint(0, 4))]
+                    for segment in ('warmup', 'main', 'cooldown')}
+        else:
+            flow = {'flow_sequence': [dict(random_step(rng), segment=rng.choice(['warmup', 'main', 'cooldown', None]))
+                                      for _ in range(rng.randint(0, 12))]}
+        flows.append(flow)
+    return flows
+
+
+def random_step(rng):
+    return {
+        'pose': rng.choice(POSES + [p.upper() for p in POSES]),
+        'duration': rng.choice([5, 30, 45, '60', 61.5, 700, '', None]),
+        'description': rng.choice(['', '  ', 'Stack the hips.', None, ['Lift', 'the chest']]),
+    }
+
+
+def validate(flows, targets, vectorize):
+    validator = FlowValidator(ValidationRules(known_poses={'mountain', 'tree', 'boat'}))
+    batch = FlowBatch()
+    batch.add_flows(flows, targets)
+    if vectorize:
+        np = pytest.importorskip('numpy')
+        findings = validator._check_vectorized(batch, np)
+    else:
+        findings = validator._check_scalar(batch)
+    return validator._build_reports(batch, findings)
+
+
+def test_scalar_and_vectorized_checks_agree():
+    flows = random_flows(300)
+    targets = [random.Random(i).choice([None, 120, 300]) for i in range(len(flows))]
+    assert validate(flows, targets, vectorize=False) == validate(flows, targets, vectorize=True)
+
+
+def test_batch_matches_single_flow_validation():
+    flows = random_flows(50)
+    validator = FlowValidator()
+    assert validator.validate_batch(flows) == [validator.validate(flow) for flow in flows]
+
+
+def test_large_batch_uses_numpy_path(monkeypatch):
+    pytest.importorskip('numpy')
+    calls = []
+    original = FlowValidator._check_vectorized
+    monkeypatch.setattr(FlowValidator, '_check_vectorized',
+                        lambda self, batch, np: calls.append(1) or original(self, batch, np))
+    flows = random_flows(200)
+    assert len(FlowValidator().validate_batch(flows)) == len(flows)
+    assert calls == [1]
+
+
+def test_mismatched_targets_raise():
+    with pytest.raises(ValueError):
+        FlowValidator().validate_batch([{'flow_sequence': []}] * 3, [300, 300])
+
+
+def test_flat_sequences_are_structure_checked():
+    flow = Flow()
+    flow.extend([{'pose': 'Mountain', 'duration': 60, 'description': 'Stand tall.'}], 'warmup')
+    flow.extend([{'pose': 'Tree', 'duration': 60, 'description': 'Root down.'}], 'main')
+    flow.extend([{'pose': 'Savasana', 'duration': 60, 'description': 'Rest.'}], 'cooldown')
+    sequence = flow.to_sequence()
+    validator = FlowValidator()
+
+    assert validator.validate({'flow_sequence': sequence})['valid']
+    reversed_report = validator.validate({'flow_sequence': sequence[::-1]})
+    assert 'segments_out_of_order' in [e['code'] for e in reversed_report['errors']]
+    missing_report = validator.validate({'flow_sequence': sequence[:2]})
+    assert 'missing_segments' in [e['code'] for e in missing_report['errors']]
+
+
+def test_untagged_flat_sequences_are_flagged():
+    report = FlowValidator().validate({'flow_sequence': [{'pose': 'Tree', 'duration': 60, 'description': 'x'}]})
+    assert report['valid']
+    assert [w['code'] for w in report['warnings']] == ['unsegmented_flow']
@@ -0,0 +1,68 @@
+from app.services.llm_backends import CompletionStore, LLMCompletion, RecordingBackend, ReplayBackend
+from app.services.llm_service import LLMService
+
+USAGE = {'prompt_tokens': 100, 'completion_tokens': 50, 'total_tokens': 150}
+
+
+class FakeLive:
+    def complete(self, model, messages, max_tokens, temperature):
+        return LLMCompletion(content='**FLOW_DESCRIPTION:** Calm', usage=dict(USAGE))
+
+
+class FakeUsage:
+    def __init__(self):
+        self.records = []
+
+    def record(self, user_id, usage):
+        self.records.append((user_id, usage))
+
+
+def service_with(backend):
+    service = LLMService.__new__(LLMService)
+    service.model = 'gpt-3.5-turbo'
+    service.user_id = 'user-1'
+    service.usage = FakeUsage()
+    service.backend = backend
+    return service
+
+
+def test_replay_does_not_count_usage(tmp_path):
+    store = CompletionStore(str(tmp_path / 'recordings.sqlite3'))
+
+    recording = service_with(RecordingBackend(FakeLive(), store))
+    assert recording._call_llm('prompt') == '**FLOW_DESCRIPTION:** Calm'
+    assert recording.usage.records == [('user-1', USAGE)]
+
+    replaying = service_with(ReplayBackend(store))
+    assert replaying._call_llm('prompt') == '**FLOW_DESCRIPTION:** Calm'
+    assert replaying.usage.records == []
+
+
+def test_recording_failure_keeps_the_live_result(tmp_path):
+    store = CompletionStore(str(tmp_path / 'recordings.sqlite3'))
+    store.close()
+    service = service_with(RecordingBackend(FakeLive(), store))
+    assert service._call_llm('prompt') == '**FLOW_DESCRIPTION:** Calm'
+    assert service.usage.records == [('user-1', USAGE)]
+
+
+class BrokenCueStore:
+    def learn(self, steps):
+        raise RuntimeError('cue store broken')
+
+    def fill(self, steps):
+        raise RuntimeError('cue store broken')
+
+
+def test_cue_failure_keeps_the_parsed_flow():
+    service = service_with(ReplayBackend(None))
+    service.cue_store = BrokenCueStore()
+    response = ('**FLOW_DESCRIPTION:** Calm\n'
+                '**WARMUP_SEQUENCE:** [{"pose": "Mountain", "duration": 60, "description": "Stand tall."}]\n'
+                '**MAIN_SEQUENCE:** [{"pose": "Tree", "duration": 60}]\n'
+                '**COOLDOWN_SEQUENCE:** [{"pose": "Savasana", "duration": 120}]')
+
+    flow = service._parse_flow_response(response)
+    assert flow.description == 'Calm'
+    assert flow.pose_names() == ['Mountain', 'Tree', 'Savasana']
+    assert flow.total_seconds == 240
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import InvalidStatus
+
+import playback_server
+from app.services import revocation_service
+from app.services.jwt_service import JWTService
+from app.services.playback_service import PlaybackScheduler
+from app.services.revocation_service import LocalRevocationStore, RevocationService
+from app.services.session_timeline import SessionTimeline
+
+USER = {'id': 'user-1', 'email': 'user@example.com'}
+
+
+def test_timeline_handles_offsets_past_32_bits():
+    day = 24 * 3600
+    timeline = SessionTimeline([{'pose': 'Savasana', 'duration': 2 ** 31 - 1}] * 3 + [{'pose': 'Rest', 'duration': day}])
+    assert timeline.total_seconds == 3 * (2 ** 31 - 1) + day
+    assert timeline.starts[-1] == 3 * (2 ** 31 - 1)
+
+
+@pytest.fixture
+def revocations(tmp_path, monkeypatch):
+    service = RevocationService(LocalRevocationStore(str(tmp_path / 'revoked.sqlite3')))
+    assert service.rebuild()
+    monkeypatch.setattr(revocation_service, '_revocation_service', service)
+    return service
+
+
+async def exchange(uri, messages, **kwargs):
+    replies = []
+    async with connect(uri, **kwargs) as websocket:
+        for message in messages:
+            await websocket.send(message)
+            replies.append(json.loads(await websocket.recv()))
+    return replies
+
+
+def run_with_server(client):
+    async def main():
+        playback_server.scheduler = PlaybackScheduler(asyncio.get_running_loop())
+        async with serve(playback_server.handle_connection, '127.0.0.1', 0,
+                         process_request=playback_server.authenticate) as server:
+            port = server.sockets[0].getsockname()[1]
+            return await client(f'ws://127.0.0.1:{port}')
+    return asyncio.run(main())
+
+
+def test_handshake_requires_a_valid_token(revocations):
+    async def client(uri):
+        statuses = []
+        for suffix in ('', '?token=garbage'):
+            try:
+                async with connect(uri + suffix):
+                    statuses.append(101)
+            except InvalidStatus as e:
+                statuses.append(e.response.status_code)
+        return statuses
+
+    assert run_with_server(client) == [401, 401]
+
+
+def test_invalid_sequences_get_an_error_frame(revocations):
+    token = JWTService().create_access_token(USER)
+    messages = [
+        '[1, 2]',
+        json.dumps({'action': 'start', 'flow_sequence': [{'pose': 'Tree', 'duration': 10 ** 12}]}),
+        json.dumps({'action': 'start', 'flow_sequence': ['Tree']}),
+        json.dumps({'action': 'start', 'flow_sequence': [{'pose': 'Tree', 'duration': 30}]}),
+    ]
+
+    async def client(uri):
+        return await exchange(f'{uri}?token={token}', messages)
+
+    replies = run_with_server(client)
+    assert [reply['type'] for reply in replies] == ['error', 'error', 'error', 'started']
+    assert replies[-1]['total_seconds'] == 30
+
+
+def test_bearer_header_is_accepted(revocations):
+    token = JWTService().create_access_token(USER)
+
+    async def client(uri):
+        return await exchange(uri, [json.dumps({'action': 'pause'})],
+                              additional_headers={'Authorization': f'Bearer {token}'})
+
+    assert run_with_server(client) == [{'type': 'error', 'message': 'No session started'}]
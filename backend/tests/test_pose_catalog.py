@@ -0,0 +1,27 @@
+import logging
+
+from app.services import pose_catalog
+
+
+def test_missing_catalog_is_reported_once(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(pose_catalog, '_catalog', None)
+    monkeypatch.setattr(pose_catalog, '_catalog_failed', False)
+    missing_json, missing_bin = str(tmp_path / 'poses.json'), str(tmp_path / 'poses.bin')
+
+    with caplog.at_level(logging.WARNING, logger=pose_catalog.__name__):
+        assert pose_catalog.get_pose_catalog(missing_json, missing_bin) is None
+        assert pose_catalog.get_pose_catalog(missing_json, missing_bin) is None
+    assert len(caplog.records) == 1
+
+
+def test_catalog_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(pose_catalog, '_catalog', None)
+    monkeypatch.setattr(pose_catalog, '_catalog_failed', False)
+    json_path, bin_path = tmp_path / 'poses.json', tmp_path / 'poses.bin'
+    json_path.write_text('{"poses": [{"name": "Warrior II", "cues": "Bend the front knee."}, {"name": "Boat"}]}')
+
+    catalog = pose_catalog.get_pose_catalog(str(json_path), str(bin_path))
+    assert len(catalog) == 2
+    assert 'warrior  ii' in catalog
+    assert catalog.get('WARRIOR II', ['cues']) == {'cues': 'Bend the front knee.'}
+    assert list(catalog.canonical_names()) == ['boat', 'warrior ii']
@@ -0,0 +1,41 @@
+import pytest
+
+from app import create_app
+from app.services.program_service import DEFAULT_FOCUSES, FOCUS_POSE_POOLS, ProgramService
+
+SPEC = {'routineName': 'Week', 'timeLength': '30', 'description': 'Strength'}
+
+
+def plan(**spec):
+    return ProgramService(llm_service=object()).plan_sessions({**SPEC, **spec})
+
+
+def test_default_focus_pools_are_disjoint():
+    plans = plan(sessions=7)
+    pools = [set(p['focusPoses']) for p in plans]
+    assert all(pools)
+    assert sum(len(pool) for pool in pools) == len(set.union(*pools))
+    for p in plans:
+        assert not set(p['focusPoses']) & set(p['avoidPoses'])
+
+
+def test_repeated_focus_splits_its_pool():
+    plans = plan(sessions=2, focuses=[DEFAULT_FOCUSES[0]])
+    first, second = (set(p['focusPoses']) for p in plans)
+    assert first and second and not first & second
+    assert first | second == set(FOCUS_POSE_POOLS[DEFAULT_FOCUSES[0]])
+
+
+def test_unknown_focuses_get_poses_no_other_session_uses():
+    plans = plan(sessions=3, focuses=[DEFAULT_FOCUSES[0], 'pranayama', 'prenatal'])
+    pools = [set(p['focusPoses']) for p in plans]
+    assert all(pools)
+    assert not pools[0] & pools[1] and not pools[0] & pools[2] and not pools[1] & pools[2]
+
+
+@pytest.mark.parametrize('focuses', ['hips', [], ['hips', 3], ['']])
+def test_program_route_rejects_invalid_focuses(focuses):
+    client = create_app('testing').test_client()
+    response = client.post('/api/flow/program', json={**SPEC, 'sessions': 2, 'focuses': focuses})
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == ['focuses must be a non-empty list of strings']
@@ -0,0 +1,114 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from app.routes import auth as auth_routes
+from app.services import revocation_service
+from app.services.jwt_service import JWTService
+from app.services.revocation_service import LocalRevocationStore, RevocationService
+
+USER = {'id': 'user-1', 'email': 'user@example.com', 'first_name': 'Ada', 'last_name': 'Lee', 'is_active': True}
+
+
+@pytest.fixture
+def revocations(tmp_path, monkeypatch):
+    service = RevocationService(LocalRevocationStore(str(tmp_path / 'revoked.sqlite3')), refresh_seconds=0.05)
+    assert service.rebuild()
+    monkeypatch.setattr(revocation_service, '_revocation_service', service)
+    return service
+
+
+class FailingStore:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('store unreachable')
+        return fail
+
+
+def test_tokens_issued_up_to_the_cutoff_are_revoked(revocations):
+    before = time.time()
+    assert revocations.revoke_user('user-1')
+    after = time.time()
+
+    # Earlier in the same second, as an integer iat from an older token would be
+    assert revocations.is_user_revoked('user-1', float(int(before)))
+    assert revocations.is_user_revoked('user-1', before)
+    assert not revocations.is_user_revoked('user-1', after + 0.001)
+    assert not revocations.is_user_revoked('user-2', before)
+
+
+def test_cutoff_is_exact_when_read_back_from_the_store(revocations, monkeypatch):
+    assert revocations.revoke_user('user-1')
+    cutoff = revocations._user_cutoffs['user-1']
+
+    # Not loaded yet, so the check goes to the store
+    unloaded = RevocationService(revocations.store)
+    monkeypatch.setattr(unloaded, '_ensure_refreshing', lambda: None)
+    assert unloaded.is_user_revoked('user-1', cutoff)
+    assert not unloaded.is_user_revoked('user-1', cutoff + 0.001)
+
+    # Loaded from the store into memory
+    loaded = RevocationService(revocations.store)
+    assert loaded.rebuild()
+    assert loaded._user_cutoffs['user-1'] == cutoff
+
+
+def test_logout_all_keeps_tokens_issued_afterwards(revocations):
+    jwt_service = JWTService()
+    old = jwt_service.create_access_token(USER)
+    assert jwt_service.revoke_user_tokens('user-1')
+    new = jwt_service.create_access_token(USER)
+
+    assert jwt_service.verify_token(old) is None
+    assert jwt_service.verify_token(new)['user_id'] == 'user-1'
+
+
+def test_checks_fail_closed_when_the_store_is_down():
+    service = RevocationService(FailingStore())
+    assert service.is_revoked('some-jti')
+    assert service.is_user_revoked('user-1', time.time())
+
+
+def test_claim_succeeds_once(revocations):
+    expires = datetime.utcnow()
+    assert revocations.claim('jti-1', 'user-1', expires) is True
+    assert revocations.claim('jti-1', 'user-1', expires) is False
+    assert revocations.is_revoked('jti-1')
+    assert RevocationService(FailingStore()).claim('jti-2', 'user-1', expires) is None
+
+
+@pytest.fixture
+def client(revocations, monkeypatch):
+    monkeypatch.setattr(auth_routes.SupabaseService, 'get_user_by_id', lambda self, user_id: dict(USER))
+    return create_app('testing').test_client()
+
+
+def test_refresh_token_rotates(client):
+    refresh_token = JWTService().create_refresh_token(USER)
+
+    first = client.post('/api/auth/refresh', json={'refresh_token': refresh_token})
+    assert first.status_code == 200
+    assert client.post('/api/auth/refresh', json={'refresh_token': refresh_token}).status_code == 401
+
+    rotated = first.get_json()['refresh_token']
+    assert client.post('/api/auth/refresh', json={'refresh_token': rotated}).status_code == 200
+
+
+def test_concurrent_refreshes_issue_one_token_pair(client):
+    refresh_token = JWTService().create_refresh_token(USER)
+    statuses = []
+    start = threading.Barrier(8)
+
+    def refresh():
+        start.wait()
+        statuses.append(client.post('/api/auth/refresh', json={'refresh_token': refresh_token}).status_code)
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert sorted(statuses) == [200] + [401] * 7
@@ -0,0 +1,27 @@
+import importlib.machinery
+import importlib.resources
+import inspect
+import sys
+
+from app.utils import startup
+
+
+def test_boot_import_timer_keeps_the_real_loader(tmp_path, monkeypatch):
+    package = tmp_path / 'timed_pkg'
+    package.mkdir()
+    (package / '__init__.py').write_text('def hello():\n    return "hi"\n')
+    (package / 'data.txt').write_text('payload')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(startup, '_boot_import_times', {})
+
+    try:
+        with startup.track_boot_imports():
+            import timed_pkg
+
+        assert 'timed_pkg' in startup.get_boot_import_times()
+        assert type(timed_pkg.__loader__) is importlib.machinery.SourceFileLoader
+        assert 'exec_module' not in vars(timed_pkg.__loader__)
+        assert importlib.resources.files('timed_pkg').joinpath('data.txt').read_text() == 'payload'
+        assert 'return "hi"' in inspect.getsource(timed_pkg.hello)
+    finally:
+        sys.modules.pop('timed_pkg', None)
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from app.services.usage_service import LocalUsageStore, UsageAccountant
+
+
+def other_worker_row(user_id, day, total_tokens):
+    return {'user_id': user_id, 'day': day, 'worker_id': 'other-worker', 'calls': 1, 'prompt_tokens': 0,
+            'completion_tokens': total_tokens, 'total_tokens': total_tokens, 'updated_at': day}
+
+
+class FailingStore:
+    def __init__(self):
+        self.reads = 0
+
+    def get_llm_usage(self, user_ids, day):
+        self.reads += 1
+        raise ConnectionError('store unreachable')
+
+    def upsert_llm_usage(self, rows):
+        return False
+
+
+class SlowStore(LocalUsageStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.release = threading.Event()
+
+    def get_llm_usage(self, user_ids, day):
+        self.release.wait(5)
+        return super().get_llm_usage(user_ids, day)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_first_check_seeds_from_other_workers(tmp_path):
+    store = LocalUsageStore(str(tmp_path / 'usage.sqlite3'))
+    accountant = UsageAccountant(store, flush_seconds=60)
+    store.upsert_llm_usage([other_worker_row('user-1', accountant._today(), 5000)])
+
+    accountant.record('user-1', {'total_tokens': 100})
+    assert accountant.tokens_today('user-1') == 5100
+    assert accountant.tokens_today('user-2') == 0
+
+
+def test_slow_store_does_not_block_the_check(tmp_path):
+    store = SlowStore(str(tmp_path / 'usage.sqlite3'))
+    accountant = UsageAccountant(store, flush_seconds=60, seed_wait_seconds=0.05)
+    store.upsert_llm_usage([other_worker_row('user-1', accountant._today(), 5000)])
+
+    started = time.monotonic()
+    assert accountant.tokens_today('user-1') == 0
+    assert time.monotonic() - started < 1
+
+    store.release.set()
+    assert wait_until(lambda: accountant.tokens_today('user-1') == 5000)
+
+
+def test_failed_seed_backs_off_and_uses_local_counters():
+    store = FailingStore()
+    accountant = UsageAccountant(store, flush_seconds=60, seed_wait_seconds=1)
+    accountant.record('user-1', {'total_tokens': 300})
+
+    assert accountant.tokens_today('user-1') == 300
+    assert accountant.tokens_today('user-1') == 300
+    assert accountant.tokens_today('user-2') == 0
+    assert store.reads == 1
+
+    accountant._seed_retry_at = 0.0
+    accountant.tokens_today('user-1')
+    assert store.reads == 2
+    assert accountant._seed_failures == 2
+
+
+def test_generate_returns_429_for_usage_recorded_by_other_workers(tmp_path, monkeypatch):
+    from app import create_app
+    from app.services import revocation_service, usage_service
+    from app.services.jwt_service import JWTService
+    from app.services.revocation_service import LocalRevocationStore, RevocationService
+
+    revocations = RevocationService(LocalRevocationStore(str(tmp_path / 'revoked.sqlite3')))
+    assert revocations.rebuild()
+    monkeypatch.setattr(revocation_service, '_revocation_service', revocations)
+    store = LocalUsageStore(str(tmp_path / 'usage.sqlite3'))
+    accountant = UsageAccountant(store, flush_seconds=60)
+    store.upsert_llm_usage([other_worker_row('user-1', accountant._today(), 5000)])
+    monkeypatch.setattr(usage_service, '_accountant', accountant)
+
+    app = create_app('testing')
+    app.config['LLM_DAILY_TOKEN_QUOTA'] = 1000
+    token = JWTService().create_access_token({'id': 'user-1', 'email': 'user@example.com'})
+    response = app.test_client().post(
+        '/api/flow/generate', headers={'Authorization': f'Bearer {token}'},
+        json={'routineName': 'Morning', 'timeLength': '30', 'description': 'Calm'})
+    assert response.status_code == 429